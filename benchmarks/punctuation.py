@@ -0,0 +1,115 @@
+"""
+Сравнивает профили ONNX Runtime модели пунктуации по скорости и точности.
+
+    python -m benchmarks.punctuation samples/*.txt
+    python -m benchmarks.punctuation --video <video_id> --video <video_id>
+
+Образцы - тексты с правильной пунктуацией, например ручные субтитры (--video берёт их с YouTube).
+Текст приводится к нижнему регистру без знаков препинания, как автоматические субтитры,
+модель восстанавливает пунктуацию, результат сравнивается с оригиналом по словам.
+"""
+import argparse
+import re
+import time
+from dataclasses import replace
+
+from server.config import settings
+from server.services.transcript.restorePunctuation import (
+    OnnxProfile, PunctuationModel, onnx_profile_from_settings
+)
+
+_PUNCTUATION_REGEX = re.compile(r"[^\w'-]+")
+
+
+def _load_video(video_id: str) -> str:
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    transcript = YouTubeTranscriptApi.list_transcripts(video_id).find_manually_created_transcript(['ru', 'en'])
+    return ' '.join(entry['text'] for entry in transcript.fetch())
+
+
+def _prepare(text: str) -> tuple[list[str], list[str]]:
+    """Слова без пунктуации в нижнем регистре и соответствующие им слова оригинала"""
+    words, reference = [], []
+    for token in text.split():
+        if word := _PUNCTUATION_REGEX.sub('', token).lower():
+            words.append(word)
+            reference.append(token)
+    return words, reference
+
+
+def _punctuate(model: PunctuationModel, words: list[str]) -> list[str]:
+    """Прогоняет слова через модель окнами как сервер, но без перекрытия"""
+    window = settings.punctuation_window_words
+    texts = [' '.join(words[start:start + window]) for start in range(0, len(words), window)]
+    result = []
+    for batch_start in range(0, len(texts), settings.punctuation_batch_size):
+        for sentences in model.infer(texts[batch_start:batch_start + settings.punctuation_batch_size]):
+            result.extend(word for sentence in sentences for word in sentence.split())
+    return result
+
+
+def _sentence_ends(tokens: list[str]) -> set[int]:
+    return {index for index, token in enumerate(tokens) if token.endswith(('.', '!', '?', '…'))}
+
+
+def _score(predicted: list[str], reference: list[str]) -> tuple[float, float]:
+    """Доля слов, совпавших с оригиналом вместе с регистром и знаками, и F1 по концам предложений"""
+    if len(predicted) != len(reference):
+        return 0.0, 0.0
+    exact = sum(p == r for p, r in zip(predicted, reference)) / len(reference)
+    predicted_ends, reference_ends = _sentence_ends(predicted), _sentence_ends(reference)
+    true_positive = len(predicted_ends & reference_ends)
+    if not true_positive:
+        return exact, 0.0
+    precision = true_positive / len(predicted_ends)
+    recall = true_positive / len(reference_ends)
+    return exact, 2 * precision * recall / (precision + recall)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='text files with punctuated transcripts')
+    parser.add_argument('--video', action='append', default=[], help='YouTube video id with manual captions')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per profile, the best one is reported')
+    args = parser.parse_args()
+
+    samples = [open(path, encoding='utf-8').read() for path in args.files]
+    samples += [_load_video(video_id) for video_id in args.video]
+    if not samples:
+        parser.error('no samples given')
+    prepared = [_prepare(sample) for sample in samples]
+    total_words = sum(len(words) for words, _ in prepared)
+
+    tuned = onnx_profile_from_settings()
+    profiles: dict[str, OnnxProfile | None] = {
+        'default': None,
+        'tuned fp32': replace(tuned, quantize=False),
+        'tuned int8': replace(tuned, quantize=True),
+    }
+
+    print(f'{len(samples)} samples, {total_words} words')
+    print(f'{"profile":<12} {"load, s":>8} {"wall, s":>8} {"cpu, s":>8} {"words/s":>8} {"exact":>7} {"sent F1":>8}')
+    for name, profile in profiles.items():
+        model = PunctuationModel(settings.punctuation_model, profile)
+        model.load()
+        best_wall = best_cpu = float('inf')
+        results = []
+        for _ in range(args.repeat):
+            wall, cpu = time.perf_counter(), time.process_time()
+            results = [_punctuate(model, words) for words, _ in prepared]
+            best_wall = min(best_wall, time.perf_counter() - wall)
+            best_cpu = min(best_cpu, time.process_time() - cpu)
+
+        scores = [_score(result, reference) for result, (_, reference) in zip(results, prepared)]
+        weights = [len(words) for words, _ in prepared]
+        exact = sum(score[0] * weight for score, weight in zip(scores, weights)) / total_words
+        f1 = sum(score[1] * weight for score, weight in zip(scores, weights)) / total_words
+        print(
+            f'{name:<12} {model.load_time:>8.2f} {best_wall:>8.2f} {best_cpu:>8.2f} '
+            f'{total_words / best_wall:>8.0f} {exact:>7.3f} {f1:>8.3f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Сравнивает построение расшифровки списком TranscriptPart и колоночным Transcript.
+
+    python -m benchmarks.transcript --lines 50000
+
+Строки генерируются в виде, в котором их отдаёт youtube_transcript_api.
+Для каждого способа выводится время построения, пиковая память при построении и время
+сериализации для кэша расшифровок.
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+import zlib
+from typing import Callable
+
+from server.schemas import TranscriptPart
+from server.services.transcript.transcript import Transcript
+
+_WORDS = 'мы сегодня поговорим о том как работает двигатель и почему это важно for everyone here'.split()
+
+
+def _entries(lines: int) -> list[dict]:
+    random.seed(0)
+    return [
+        {'text': ' '.join(random.choices(_WORDS, k=7)), 'start': index * 2.5, 'duration': 3.1}
+        for index in range(lines)
+    ]
+
+
+def _build_parts(entries: list[dict]) -> list[TranscriptPart]:
+    return [TranscriptPart(**entry) for entry in entries]
+
+
+def _build_transcript(entries: list[dict]) -> Transcript:
+    transcript = Transcript()
+    for entry in entries:
+        transcript.append(entry['text'], entry['start'], entry['duration'])
+    transcript.text_at(0)  # тексты склеиваются в одну строку при первом чтении, учитываем это в замерах
+    return transcript
+
+
+def _serialize_parts(parts: list[TranscriptPart]) -> bytes:
+    rows = [[part.text, part.start, part.duration] for part in parts]
+    return zlib.compress(json.dumps(rows, ensure_ascii=False).encode())
+
+
+def _serialize_transcript(transcript: Transcript) -> bytes:
+    return zlib.compress(transcript.to_bytes())
+
+
+def _measure(build: Callable, entries: list[dict], repeat: int) -> tuple[float, int, object]:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(entries)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = build(entries)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=50_000, help='caption lines in the transcript')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per approach, the best one is reported')
+    args = parser.parse_args()
+    entries = _entries(args.lines)
+
+    print(f'{args.lines} lines')
+    print(f'{"approach":<20} {"build, ms":>10} {"peak, MiB":>10} {"serialize, ms":>14} {"bytes":>10}')
+    for name, build, serialize in (
+            ('list[TranscriptPart]', _build_parts, _serialize_parts),
+            ('Transcript', _build_transcript, _serialize_transcript),
+    ):
+        build_time, peak, result = _measure(build, entries, args.repeat)
+        start = time.perf_counter()
+        serialized = serialize(result)
+        serialize_time = time.perf_counter() - start
+        print(
+            f'{name:<20} {build_time * 1000:>10.1f} {peak / 2 ** 20:>10.1f} '
+            f'{serialize_time * 1000:>14.1f} {len(serialized):>10}'
+        )
+
+
+if __name__ == '__main__':
+    main()
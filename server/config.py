@@ -0,0 +1,76 @@
+from pydantic import BaseSettings
+
+
+class Settings(BaseSettings):
+    """Настройки сервера, переопределяются переменными окружения с префиксом YTA_"""
+
+    # Пул соединений к провайдерам языковых моделей
+    llm_connection_limit: int = 100
+    llm_connection_limit_per_host: int = 20
+    llm_keepalive_timeout: float = 75
+    llm_dns_cache_ttl: int = 300
+    llm_request_timeout: float = 900
+    # Сколько кусков одного запроса отправляется языковой модели одновременно
+    llm_chunk_concurrency: int = 4
+    # Перекрытие соседних кусков субтитров в токенах
+    llm_chunk_overlap_tokens: int = 0
+
+    # Кэш ответов языковой модели
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = '.cache/llm_responses.sqlite3'
+    llm_cache_ttl: float = 7 * 24 * 60 * 60
+    llm_cache_max_bytes: int = 256 * 1024 * 1024
+
+    # Кэш расшифровок видео в памяти процесса
+    transcript_cache_max_bytes: int = 64 * 1024 * 1024
+    transcript_cache_ttl: float = 24 * 60 * 60
+    transcript_cache_negative_ttl: float = 6 * 60 * 60
+    # Сколько секунд ждать описание видео с главами, потом темы делятся без глав
+    description_timeout: float = 5
+
+    # Контейнеры с Whisper, запросы распределяются между ними
+    whisper_urls: list[str] = ['http://localhost:9000']
+    whisper_health_path: str = '/docs'
+    whisper_health_interval: float = 30
+    whisper_health_timeout: float = 5
+    whisper_max_failures: int = 3
+
+    # Расшифровка длинных видео через Whisper по кускам (нужен ffmpeg)
+    whisper_segment_length: float = 10 * 60
+    whisper_segment_overlap: float = 5
+    whisper_segment_concurrency: int = 4
+    whisper_split_at_silence: bool = True
+    whisper_silence_window: float = 15
+
+    # Модель восстановления пунктуации, при eager загружается при запуске сервера
+    punctuation_model: str = '1-800-BAD-CODE/xlm-roberta_punctuation_fullstop_truecase'
+    punctuation_eager_load: bool = True
+    # Текст подаётся модели окнами по punctuation_window_words слов, по punctuation_batch_size окон за раз
+    punctuation_window_words: int = 256
+    punctuation_window_overlap: int = 32
+    punctuation_batch_size: int = 16
+    # Процессы с моделью (0 - пул потоков сервера) и общие пакеты окон от всех запросов
+    punctuation_workers: int = 1
+    punctuation_max_batch_size: int = 32
+    punctuation_max_wait: float = 0.02
+    # Настройки ONNX Runtime: потоки на процесс (0 - решает ONNX Runtime), уровень оптимизации графа
+    # (disabled, basic, extended, all) и int8 копия модели, которая сохраняется в punctuation_cache_dir
+    punctuation_intra_op_threads: int = 2
+    punctuation_inter_op_threads: int = 1
+    punctuation_graph_optimization: str = 'all'
+    punctuation_quantize: bool = False
+    punctuation_cache_dir: str = '.cache/punctuation'
+
+    # Локальное деление на темы (topic_segmentation=local): сколько предложений сравнивается до и после границы
+    segmenter_window: int = 6
+
+    # Очередь задач генерации статей
+    job_workers: int = 4
+    job_queue_size: int = 100
+    job_ttl: float = 60 * 60
+
+    class Config:
+        env_prefix = 'YTA_'
+
+
+settings = Settings()
@@ -1,4 +1,9 @@
-from aiohttp import ClientSession
+import ssl
+
+import certifi
+from aiohttp import ClientSession, ClientTimeout, DummyCookieJar, TCPConnector
+
+from server.config import settings
 
 
 class _HttpClient:
@@ -14,4 +19,29 @@ class _HttpClient:
         return self.session
 
 
+class _ProviderTransport(_HttpClient):
+    """
+    Общий пул соединений для всех провайдеров g4f.
+    Держит keep-alive соединения с ограничением на хост, кэш DNS и один SSL контекст,
+    чтобы запросы по темам статьи не платили за TCP+TLS рукопожатие каждый раз.
+    """
+
+    def start(self):
+        ssl_context = ssl.create_default_context(cafile=certifi.where())
+        connector = TCPConnector(
+            limit=settings.llm_connection_limit,
+            limit_per_host=settings.llm_connection_limit_per_host,
+            keepalive_timeout=settings.llm_keepalive_timeout,
+            ttl_dns_cache=settings.llm_dns_cache_ttl,
+            use_dns_cache=True,
+            ssl=ssl_context,
+        )
+        self.session = ClientSession(
+            connector=connector,
+            timeout=ClientTimeout(total=settings.llm_request_timeout),
+            cookie_jar=DummyCookieJar(),
+        )
+
+
 http_client = _HttpClient()
+provider_transport = _ProviderTransport()
@@ -4,10 +4,14 @@ from logging.config import dictConfig
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from server.dependencies import http_client
+from server.dependencies import http_client, provider_transport
 from server.logger import LogConfig
 from server.routers import api
+from server.services.jobs import article_jobs
+from server.services.llm_cache import llm_cache
 from server.services.transcript.pytube_fix import fix
+from server.services.transcript.restorePunctuation import punctuation_service
+from server.services.transcript.whisper_pool import whisper_pool
 
 dictConfig(LogConfig().dict())
 fix()
@@ -15,9 +19,18 @@ fix()
 
 @asynccontextmanager
 async def _lifespan(_: FastAPI):
+    punctuation_service.start()
     http_client.start()
+    provider_transport.start()
+    whisper_pool.start()
+    article_jobs.start()
     yield
+    await article_jobs.stop()
+    await whisper_pool.stop()
+    await provider_transport.stop()
     await http_client.stop()
+    await punctuation_service.stop()
+    llm_cache.close()
 
 
 app = FastAPI(
@@ -1,9 +1,20 @@
+import asyncio
+
 from aiohttp import ClientSession
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from server.dependencies import http_client, provider_transport
+from server.logger import get_logger
+from server.schemas import ArticleRequest, Article, ArticleEvent, ArticleEventType, Job, JobRequest
+from server.services.articleGenerator import ArticleGenerator, EmptyTranscriptError
+from server.services.gpt_requests import completions_in_flight
+from server.services.jobs import article_jobs
+from server.services.llm_cache import llm_cache
+from server.services.transcript.restorePunctuation import punctuation_service
+from server.services.transcript.whisper_pool import whisper_pool
 
-from server.dependencies import http_client
-from server.schemas import ArticleRequest, Article
-from server.services.articleGenerator import ArticleGenerator
+logger = get_logger()
 
 router = APIRouter(prefix="/api/v1")
 
@@ -13,7 +24,87 @@ router = APIRouter(prefix="/api/v1")
              description="Automatic creation of a text publication based on a youtube video url.",
              response_model=Article)
 async def create_article(article_request: ArticleRequest,
-                         session: ClientSession = Depends(http_client)):
-    generator = ArticleGenerator(request=article_request, session=session)
-    article = await generator.generate_article()
+                         session: ClientSession = Depends(http_client),
+                         llm_session: ClientSession = Depends(provider_transport)):
+    generator = ArticleGenerator(request=article_request, session=session, llm_session=llm_session)
+    try:
+        article = await generator.generate_article()
+    except EmptyTranscriptError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
     return article
+
+
+@router.post("/article/stream",
+             tags=['article'],
+             description="Same as /article/, but streams stages as they finish, one JSON event per line "
+                         "(application/x-ndjson): transcript, partial (title, description, topics), "
+                         "topic (for each generated topic), done (generation time) or error.")
+async def stream_article(article_request: ArticleRequest,
+                         session: ClientSession = Depends(http_client),
+                         llm_session: ClientSession = Depends(provider_transport)):
+    generator = ArticleGenerator(request=article_request, session=session, llm_session=llm_session)
+
+    async def events():
+        try:
+            async for event in generator.generate_events():
+                yield event.json(ensure_ascii=False) + '\n'
+        except Exception as e:
+            logger.exception('Streaming article for %s failed', article_request.url)
+            yield ArticleEvent(event=ArticleEventType.ERROR, data={'detail': str(e)}).json(ensure_ascii=False) + '\n'
+
+    return StreamingResponse(events(), media_type='application/x-ndjson')
+
+
+@router.post("/jobs",
+             tags=['jobs'],
+             description="Queue creation of a text publication based on a youtube video url. "
+                         "Returns a job to poll, the finished job is also sent to webhook_url if given.",
+             status_code=status.HTTP_202_ACCEPTED,
+             response_model=Job)
+async def create_job(job_request: JobRequest):
+    try:
+        return article_jobs.submit(job_request)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='Job queue is full')
+
+
+@router.get("/jobs/{job_id}",
+            tags=['jobs'],
+            description="Status of a queued article and the article itself once it is done.",
+            response_model=Job)
+async def get_job(job_id: str):
+    if job := article_jobs.get(job_id):
+        return job
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Job not found')
+
+
+@router.get("/whisper/backends",
+            tags=['whisper'],
+            description="Whisper backends with health state, outstanding requests and smoothed latency in seconds.")
+async def get_whisper_backends():
+    return whisper_pool.stats()
+
+
+@router.get("/llm/cache",
+            tags=['llm'],
+            description="Hits and misses of the language model response cache since the worker started "
+                        "and the number of distinct requests to the model in flight.")
+async def get_llm_cache():
+    return {**llm_cache.stats(), 'in_flight': completions_in_flight()}
+
+
+@router.get("/health",
+            tags=['health'],
+            description="Readiness of the worker. With eager loading 200 once the punctuation model is loaded "
+                        "and warmed up, 503 before; with lazy loading always 200, the model loads on first use. "
+                        "Reports whether the model is loaded and its load time in seconds.")
+async def get_health():
+    ready = punctuation_service.ready
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            'ready': ready,
+            'loaded': punctuation_service.loaded,
+            'punctuation_model': punctuation_service.stats(),
+        },
+    )
@@ -1,7 +1,7 @@
 from enum import Enum
-from typing import Optional
+from typing import Any, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import AnyHttpUrl, BaseModel, Field, PrivateAttr
 from pydantic.dataclasses import dataclass
 
 _YOUTUBE_REGEX = r'^.*(youtu\.be\/|v\/|u\/\w\/|embed\/|watch\?v=|\&v=)([^#\&\?]*).*'
@@ -16,12 +16,30 @@ class TranscriptPart:
     duration: float
 
 
+class TranscriptSource(str, Enum):
+    """Происхождение расшифровки"""
+    MANUAL = 'manual'  # субтитры, написанные автором видео
+    GENERATED = 'generated'  # автоматические субтитры YouTube
+    WHISPER = 'whisper'
+
+
+def _to_seconds(time_str: str) -> int:
+    h, m, s = time_str.split(':')
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
 class ScreenshotSaveType(str, Enum):
     """Типы сохранения скриншотов"""
     DIRECT = 'direct'
     IMGUR = 'imgur'
 
 
+class TopicSegmentationType(str, Enum):
+    """Чем делить расшифровку на темы"""
+    LLM = 'llm'  # границы тем вместе с заголовком предлагает языковая модель
+    LOCAL = 'local'  # границы по сходству предложений (TextTiling), модель пишет только заголовок и описание
+
+
 class ScreenshotSelectorType(str, Enum):
     """Типы селектора скриншотов"""
     UNIFORM = 'uniform'
@@ -38,6 +56,8 @@ class ArticleRequest(BaseModel):
     start: int = Field(ge=0, default=0)
     end: int = Field(ge=0, default=0)
     force_whisper: bool = False
+    bypass_cache: bool = False
+    topic_segmentation: TopicSegmentationType = TopicSegmentationType.LLM
     selector: ScreenshotSelectorType = ScreenshotSelectorType.UNIFORM
     image_save_format: ScreenshotSaveType = ScreenshotSaveType.DIRECT
 
@@ -49,6 +69,21 @@ class ArticleTopic(BaseModel):
     title: Optional[str] = None
     paragraphs: Optional[str] = None
     images: list[str] = []
+    _start_seconds: int = PrivateAttr()
+    _end_seconds: int = PrivateAttr()
+
+    def __init__(self, **data: Any) -> None:
+        super().__init__(**data)
+        self._start_seconds = _to_seconds(self.start)
+        self._end_seconds = _to_seconds(self.end)
+
+    @property
+    def start_seconds(self) -> int:
+        return self._start_seconds
+
+    @property
+    def end_seconds(self) -> int:
+        return self._end_seconds
 
 
 class GenerationTime(BaseModel):
@@ -67,3 +102,39 @@ class Article(BaseModel):
     description: str
     topics: list[ArticleTopic]
     generation_time: GenerationTime
+
+
+class ArticleEventType(str, Enum):
+    """Этапы генерации статьи, о которых сообщает потоковый endpoint"""
+    TRANSCRIPT = 'transcript'
+    PARTIAL = 'partial'
+    TOPIC = 'topic'
+    DONE = 'done'
+    ERROR = 'error'
+
+
+class ArticleEvent(BaseModel):
+    """Событие потоковой генерации статьи"""
+    event: ArticleEventType
+    data: dict[str, Any] = {}
+
+
+class JobStatus(str, Enum):
+    """Состояния задачи генерации статьи"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class JobRequest(ArticleRequest):
+    """Схема запроса статьи в очередь, для endpoint"""
+    webhook_url: Optional[AnyHttpUrl] = None
+
+
+class Job(BaseModel):
+    """Задача генерации статьи"""
+    id: str
+    status: JobStatus = JobStatus.QUEUED
+    result: Optional[Article] = None
+    error: Optional[str] = None
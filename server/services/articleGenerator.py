@@ -1,20 +1,30 @@
 import asyncio
+import math
 import time
-from datetime import timedelta
-from typing import Sequence, Iterable, TYPE_CHECKING
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import AsyncIterator, Sequence, Iterable, Optional, TYPE_CHECKING
 
-import nltk
 import pytube
 from aiohttp import ClientSession
 from youtube_transcript_api import _errors as youtube_transcript_errors
 
+from server.config import settings
 from server.logger import get_logger
-from server.schemas import ArticleRequest, Article, TranscriptPart, ArticleTopic, GenerationTime
+from server.schemas import (
+    ArticleRequest, Article, ArticleTopic, GenerationTime, ArticleEvent, ArticleEventType, TranscriptSource,
+    TopicSegmentationType,
+)
+from server.services.chapters import fit_chapters, get_description, parse_chapters
 from server.services.gpt_requests import gpt_request
+from server.services.segmenter import segment_topics
+from server.services.transcript.cached import CachedTranscriptProvider
+from server.services.transcript.dedup import DeduplicationStats, deduplicate
 from server.services.transcript.fromWhisper import WhisperTranscriptProvider
 from server.services.transcript.fromYoutube import YouTubeTranscriptProvider
-from server.services.transcript.restorePunctuation import restore_punctuation
-from server.services.transcript.utils import preporcess_transcript
+from server.services.transcript.normalize import normalize_text
+from server.services.transcript.sentences import get_sentences
+from server.services.transcript.transcript import Transcript, TranscriptEntry
 
 if TYPE_CHECKING:
     from aiohttp import ClientSession
@@ -22,6 +32,10 @@ if TYPE_CHECKING:
 logger = get_logger()
 
 
+class EmptyTranscriptError(ValueError):
+    """В расшифровке нет речи, только пометки вроде [Музыка]: статью писать не по чему"""
+
+
 class ArticleGenerator:
     """
     Генерирует статьи на основе запроса.
@@ -30,14 +44,22 @@ class ArticleGenerator:
     def __init__(
             self,
             request: ArticleRequest,
-            session: ClientSession
+            session: ClientSession,
+            llm_session: ClientSession,
     ) -> None:
         self.request = request
         self.session = session
+        self.llm_session = llm_session
         self._article: Article
 
     async def generate_article(self) -> Article:
         """Выполняет все шаги по генерации статьи и возвращает её"""
+        async for _ in self.generate_events():
+            pass
+        return self._article
+
+    async def generate_events(self) -> AsyncIterator[ArticleEvent]:
+        """Выполняет все шаги по генерации статьи, сообщая о каждом готовом этапе"""
 
         start_time = time.monotonic()
         request = self.request
@@ -47,27 +69,88 @@ class ArticleGenerator:
         logger.info('Starting generating article for %s', url)
         logger.info('Gathering transcript for %s', url)
         transcript_generation_start_time = time.monotonic()
-        transcript = await self._get_transcript()  # получили список объектов транскрипции вида TranscriptPart(text=..., start=..., duration=...)
+        description_task = asyncio.create_task(get_description(url))  # главы из описания, пока скачиваются субтитры
+        transcript = await self._get_transcript()  # получили расшифровку, строки вида TranscriptLine(text=..., start=..., duration=...)
         transcript_generation_time = time.monotonic() - transcript_generation_start_time
         if request.start or request.end:  # если есть начало и конец запроса, то получили список объектов из этого промежутка
-            transcript = _truncate_transcript(transcript, request.start, request.end)
+            transcript = transcript.slice(request.start, request.end or float('inf'))
+        deduplicated = DeduplicationStats()
+        if transcript.source is TranscriptSource.GENERATED:  # повторы между строками бывают только в автоматических
+            transcript, deduplicated = deduplicate(transcript)
+            logger.info(
+                'Deduplication saved %d characters, ~%d tokens for %s',
+                deduplicated.characters, deduplicated.tokens, url,
+            )
         logger.debug('Transcript for %s %s', url, transcript)
-
-        sentences = await self._get_sentences(transcript)
-        logger.debug('Sentences from transcript -->  %s', transcript)
-
-        logger.info('Start generating article title and themes for %s', url)
-        await self._generate_partial_article(transcript)
-
-        await self._generate_article_content(transcript)
+        yield ArticleEvent(event=ArticleEventType.TRANSCRIPT, data={
+            'video_id': pytube.YouTube(request.url).video_id,
+            'parts': len(transcript),
+            'source': transcript.source,
+            'deduplicated': {'characters': deduplicated.characters, 'tokens': deduplicated.tokens},
+            'time': transcript_generation_time,
+        })
+        # без речи промпт пустой и модель не вернёт даже заголовок, поэтому дальше идти нельзя
+        if not any(normalize_text(line.text) for line in transcript):
+            description_task.cancel()
+            raise EmptyTranscriptError(f'Transcript for {url} has no speech, only annotations like [Музыка]')
+
+        # предложения нужны только для тем, поэтому делятся пока генерируется заголовок
+        sentences_task = asyncio.create_task(get_sentences(transcript))
+        topic_tasks: list[asyncio.Task[tuple[int, ArticleTopic]]] = []
+        summary_task: Optional[asyncio.Task[tuple[dict, float]]] = None
+        try:
+            topics = self._chapter_topics(transcript, await self._wait_description(description_task))
+            if topics is not None:
+                logger.info('Use %d chapters from description as themes for %s', len(topics), url)
+
+            if topics is not None or request.topic_segmentation is TopicSegmentationType.LOCAL:
+                # границы тем находятся без модели, поэтому заголовок генерируется, пока делятся предложения
+                # и пишутся темы
+                logger.info('Start generating article title for %s', url)
+                summary_task = asyncio.create_task(self._generate_summary(transcript))
+                sentences = await sentences_task
+                logger.debug('Sentences from transcript -->  %s', sentences)
+                if topics is None:
+                    logger.info('Start segmenting themes for %s', url)
+                    topics = self._local_topics(transcript, sentences)
+                self._create_article(topics)
+                content_start_time = time.monotonic()
+                topic_tasks = self._start_topics(sentences)
+                summary, title_time = await summary_task
+                self._article.title = summary['title'] or ''
+                self._article.description = summary['description'] or ''
+                self._article.generation_time.title = title_time
+            else:
+                logger.info('Start generating article title and themes for %s', url)
+                await self._generate_partial_article(transcript)
+            yield ArticleEvent(event=ArticleEventType.PARTIAL, data=self._article.dict(include={
+                'video_id', 'title', 'description', 'topics'
+            }))
+
+            if topics is None:
+                sentences = await sentences_task
+                logger.debug('Sentences from transcript -->  %s', sentences)
+                content_start_time = time.monotonic()
+                topic_tasks = self._start_topics(sentences)
+
+            async for index, topic in self._collect_topics(topic_tasks, content_start_time):
+                yield ArticleEvent(event=ArticleEventType.TOPIC, data={'index': index, 'topic': topic.dict()})
+        finally:
+            description_task.cancel()
+            sentences_task.cancel()
+            if summary_task:
+                summary_task.cancel()
+            for topic_task in topic_tasks:
+                topic_task.cancel()
 
         article = self._article
         article.generation_time.transcript = transcript_generation_time
-        return article
+        article.generation_time.total = time.monotonic() - start_time
+        yield ArticleEvent(event=ArticleEventType.DONE, data={'generation_time': article.generation_time.dict()})
 
     #
     #         screenshot_periods = [
-    #             (get_sec(topic.start), get_sec(topic.end)) for topic in article.topics
+    #             (topic.start_seconds, topic.end_seconds) for topic in article.topics
     #         ]
     #         logger.info('gathering frames and generating content for %s', url)
     #         logger.debug('Screenshot Periods %s', screenshot_periods)
@@ -94,54 +177,32 @@ class ArticleGenerator:
     #         article.generation_time.transcript = transcript_generation_time
     #         return article
     #
-    async def _get_transcript(self) -> list[TranscriptPart]:
+    async def _get_transcript(self) -> Transcript:
         """Выбирает TranscriptProvider исходя из запроса и запрашивает транскрипцию"""
         url = pytube.YouTube(self.request.url).watch_url
         if self.request.force_whisper:
-            provider = WhisperTranscriptProvider(url, self.session)
+            provider = CachedTranscriptProvider(WhisperTranscriptProvider(url, self.session))
         else:
-            provider = YouTubeTranscriptProvider(url, self.session)
+            provider = CachedTranscriptProvider(YouTubeTranscriptProvider(url, self.session))
         try:
             return await provider.get_transcript()
         except youtube_transcript_errors.TranscriptsDisabled:
             logger.info('No transcripts for %s, use whisper fallback', url)
-            provider = WhisperTranscriptProvider(url, self.session)
+            provider = CachedTranscriptProvider(WhisperTranscriptProvider(url, self.session))
             return await provider.get_transcript()
 
-    async def _get_sentences(
-            self,
-            transcript_parts: Sequence[TranscriptPart],
-    ) -> list[TranscriptPart]:
-        """Разделяем субтитры из видео на предложения"""
-        raw_text = ' '.join([part.text for part in transcript_parts]).lower()  # получаем голый текст
-        clear_text = preporcess_transcript(raw_text)  # убираем лишнее из текста
-        del raw_text
-
-        sentences_list = restore_punctuation(clear_text)  # восстанавливаем пунктуацию
-        sentences_str = ' '.join(sentences_list[0])
-        del sentences_list
-
-        sentences = nltk.sent_tokenize(sentences_str)  # разделяем на предложения
-        del sentences_str
-
-        print("ПРЕДЛОЖЕНИЯ", sentences)
-        return sentences
-
     async def _generate_partial_article(
             self,
-            transcript_parts: Sequence[TranscriptPart],
+            transcript_parts: Sequence[TranscriptEntry],
     ) -> None:
         """Генерирует заголовок и время для каждой темы"""
         start_time = time.monotonic()
-        subtitles = _format_transcript(transcript_parts)
-        article_dict = await gpt_request('title', '\n'.join(subtitles), self.session)
+        subtitles = _FormattedTranscript(transcript_parts)
+        article_dict = await gpt_request('title', subtitles.text, self.llm_session,
+                                         bypass_cache=self.request.bypass_cache)
         logger.info('Complete theme and topics ...')
 
-        if self.request.number_of_paragraphs == 3:
-            number_of_paragraphs = (transcript_parts[-1].start - transcript_parts[0].start) / 300
-        else:
-            number_of_paragraphs = self.request.number_of_paragraphs
-
+        number_of_paragraphs = self._number_of_paragraphs(transcript_parts)
         topics = [ArticleTopic(**topic_data) for topic_data in article_dict['topics']]
         if number_of_paragraphs < len(topics):
             number_of_seconds = transcript_parts[-1].start - transcript_parts[0].start
@@ -159,38 +220,104 @@ class ArticleGenerator:
             generation_time=GenerationTime(title=time.monotonic() - start_time),
         )
 
-    async def _generate_article_content(
+    async def _wait_description(self, description_task: 'asyncio.Task[str]') -> str:
+        """Описание видео, пустое если YouTube не ответил за description_timeout секунд"""
+        try:
+            return await asyncio.wait_for(description_task, settings.description_timeout)
+        except asyncio.TimeoutError:
+            logger.warning('No description for %s in %gs, ignore chapters', self.request.url,
+                           settings.description_timeout)
+            return ''
+
+    def _chapter_topics(
             self,
-            transcript_parts: Sequence[TranscriptPart],
-    ) -> None:
-        """Генерирует контент и заголовок для каждой темы"""
+            transcript_parts: Sequence[TranscriptEntry],
+            description: str,
+    ) -> Optional[list[ArticleTopic]]:
+        """Темы по главам из описания видео с их названиями, None если глав нет"""
+        if not transcript_parts:
+            return None
+        last = transcript_parts[-1]
+        chapters = parse_chapters(description, transcript_parts[0].start, last.start + last.duration)
+        if not chapters:
+            return None
+        chapters = fit_chapters(chapters, round(self._number_of_paragraphs(transcript_parts)))
+        return _topics_from_bounds([(chapter.start, chapter.end, chapter.title) for chapter in chapters])
+
+    def _local_topics(
+            self,
+            transcript_parts: Sequence[TranscriptEntry],
+            sentences: Transcript,
+    ) -> list[ArticleTopic]:
+        """Делит предложения на темы без языковой модели"""
+        number_of_paragraphs = max(1, round(self._number_of_paragraphs(transcript_parts)))
+        bounds = segment_topics(sentences, number_of_paragraphs, settings.segmenter_window)
+        return _topics_from_bounds([(start, end, None) for start, end in bounds])
+
+    def _create_article(self, topics: list[ArticleTopic]) -> None:
+        """Статья с готовыми темами, заголовок и описание заполняются ответом _generate_summary"""
+        logger.info('Complete topics count ...')
+        self._article = Article(
+            video_id=pytube.YouTube(self.request.url).video_id,
+            title='',
+            description='',
+            topics=topics,
+            generation_time=GenerationTime(),
+        )
+
+    async def _generate_summary(self, transcript_parts: Sequence[TranscriptEntry]) -> tuple[dict, float]:
+        """Генерирует только заголовок и описание статьи, возвращает их и время генерации"""
         start_time = time.monotonic()
+        subtitles = _FormattedTranscript(transcript_parts)
+        summary = await gpt_request('summary', subtitles.text, self.llm_session,
+                                    bypass_cache=self.request.bypass_cache)
+        logger.info('Complete theme ...')
+        return summary, time.monotonic() - start_time
+
+    def _number_of_paragraphs(self, transcript_parts: Sequence[TranscriptEntry]) -> float:
+        """Запрошенное количество тем, по умолчанию - одна тема на пять минут видео"""
+        if self.request.number_of_paragraphs == 3:
+            return (transcript_parts[-1].start - transcript_parts[0].start) / 300
+        return self.request.number_of_paragraphs
+
+    def _start_topics(self, transcript_parts: Transcript) -> list[asyncio.Task[tuple[int, ArticleTopic]]]:
+        """Запускает генерацию контента и заголовка для каждой темы"""
         topics = self._article.topics
 
-        transcript_parts_for_topics = [
-            _select_transcript_entries_for_topic(
-                transcript_parts, topic
-            ) for topic in topics
-        ]
+        subtitles = _FormattedTranscript(transcript_parts)
+        subtitles_for_topics = [subtitles.slice(topic.start_seconds, topic.end_seconds) for topic in topics]
 
         logger.debug(
             'Lenght of transcript: %d before splitting, %d after',
-            len(transcript_parts),
-            sum(len(entry) for entry in transcript_parts_for_topics)
+            len(subtitles.text),
+            sum(len(topic_subtitles) for topic_subtitles in subtitles_for_topics)
         )
 
-        topic_datas = await asyncio.gather(*[
-            gpt_request('topic', '\n'.join(_format_transcript(transcript_parts)), self.session)
-            for transcript_parts in transcript_parts_for_topics if transcript_parts
-        ])
-        for data, filtered_topics in zip(topic_datas, topics):
-            title, *paragraphs = data.splitlines()
-            if not paragraphs:
-                filtered_topics.title = 'Не удалось сгенерировать'
-                filtered_topics.paragraphs = title
-            else:
-                filtered_topics.title = title
-                filtered_topics.paragraphs = '\n'.join(paragraphs)
+        async def generate_topic(index: int, topic_subtitles: str) -> tuple[int, ArticleTopic]:
+            data = await gpt_request('topic', topic_subtitles, self.llm_session,
+                                     bypass_cache=self.request.bypass_cache)
+            _fill_topic(topics[index], data)
+            return index, topics[index]
+
+        return [
+            asyncio.create_task(generate_topic(index, topic_subtitles))
+            for index, topic_subtitles in enumerate(subtitles_for_topics) if topic_subtitles
+        ]
+
+    async def _collect_topics(
+            self,
+            topic_tasks: list[asyncio.Task[tuple[int, ArticleTopic]]],
+            start_time: float,
+    ) -> AsyncIterator[tuple[int, ArticleTopic]]:
+        """Отдаёт темы по мере готовности"""
+        try:
+            for topic_task in asyncio.as_completed(topic_tasks):
+                yield await topic_task
+        finally:
+            for topic_task in topic_tasks:
+                topic_task.cancel()
+
+        topics = self._article.topics
         filtered_topics = list(filter(lambda topic: topic.paragraphs, topics))
         if len(filtered_topics) != len(topics):
             logger.warning(
@@ -200,23 +327,70 @@ class ArticleGenerator:
         self._article.generation_time.content = time.monotonic() - start_time
 
 
-def _truncate_transcript(
-        transcript: list[TranscriptPart],
-        start: float,
-        end: float
-) -> list[TranscriptPart]:
-    """Выбирает субтитры, которые подходят по времени."""
-    return [entry for entry in transcript if start < entry.start < end]
+def _fill_topic(topic: ArticleTopic, data: str) -> None:
+    """
+    Заполняет тему ответом модели: первая строка - заголовок, остальные - абзацы.
+    Заголовок, который уже есть у темы (название главы), не заменяется.
+    """
+    title, *paragraphs = data.splitlines() or ['']
+    if not paragraphs:
+        topic.title = topic.title or 'Не удалось сгенерировать'
+        topic.paragraphs = title
+    else:
+        topic.title = topic.title or title
+        topic.paragraphs = '\n'.join(paragraphs)
+
+
+def _topics_from_bounds(bounds: list[tuple[float, float, Optional[str]]]) -> list[ArticleTopic]:
+    """Темы по началу, концу в секундах и названию"""
+    last = len(bounds) - 1
+    return [
+        # конец последней темы округляется вверх, иначе последнее предложение не попадёт в её срез
+        ArticleTopic(
+            start=_format_time(start),
+            end=_format_time(math.ceil(end) if index == last else end),
+            title=title,
+        )
+        for index, (start, end, title) in enumerate(bounds)
+    ]
 
 
-def _format_transcript(transcript_parts: Iterable[TranscriptPart]) -> list[str]:
-    """Приводит TranscriptPart к формату строки, которая будет отправлена языковой модели"""
-    result = []
-    for entry in transcript_parts:
-        start = entry.start
-        text = entry.text
-        result.append(f'{timedelta(seconds=int(start))} - {text}')
-    return result
+class _FormattedTranscript:
+    """
+    Расшифровка в формате, который отправляется языковой модели: строки 'h:mm:ss - текст'.
+    Форматируется один раз в общую строку с индексом начала каждой строки,
+    текст для любого промежутка времени - один срез этой строки.
+    """
+
+    def __init__(self, transcript_parts: Iterable[TranscriptEntry]) -> None:
+        lines = []
+        self.starts = array('d')
+        self.offsets = array('q', [0])
+        for entry in transcript_parts:
+            if text := normalize_text(entry.text):  # строки только из пометок вроде [музыка] не отправляются
+                line = f'{_format_time(entry.start)} - {text}\n'
+                lines.append(line)
+                self.starts.append(entry.start)
+                self.offsets.append(self.offsets[-1] + len(line))
+        self._text = ''.join(lines)
+
+    @property
+    def text(self) -> str:
+        return self._text[:-1]
+
+    def slice(self, start: float, end: float) -> str:
+        """Строки, начавшиеся в [start, end]"""
+        first = bisect_left(self.starts, start)
+        last = bisect_right(self.starts, end)
+        if first >= last:
+            return ''
+        return self._text[self.offsets[first]:self.offsets[last] - 1]
+
+
+def _format_time(seconds: float) -> str:
+    """Время в формате h:mm:ss, доли секунды отбрасываются"""
+    seconds = int(seconds)
+    return f'{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}'
 
 
 def _recombine_topics(
@@ -226,12 +400,12 @@ def _recombine_topics(
     """
     Соединяет несколько подтем в одну
     """
-    last_topic_end = get_sec(old_topics[-1].end)
+    last_topic_end = old_topics[-1].end_seconds
     topics = []
     topic_start_time = old_topics[0].start
-    topic_start_second = get_sec(topic_start_time)
+    topic_start_second = old_topics[0].start_seconds
     for old_topic in old_topics:
-        end_time = get_sec(old_topic.end)
+        end_time = old_topic.end_seconds
         if (
                 end_time - topic_start_second > approximate_topic_length and
                 last_topic_end - topic_start_second > approximate_topic_length
@@ -250,20 +424,3 @@ def _recombine_topics(
             )
 
     return topics
-
-
-def get_sec(time_str: str) -> int:
-    h, m, s = time_str.split(':')
-    return int(h) * 3600 + int(m) * 60 + int(s)
-
-
-def _select_transcript_entries_for_topic(
-        transcript_parts: Sequence[TranscriptPart],
-        topic: ArticleTopic,
-) -> list[TranscriptPart]:
-    """
-    Выбирает субтитры, которые подходят под указанную тему исходя из времени.
-    """
-    start = get_sec(topic.start)
-    end = get_sec(topic.end)
-    return [entry for entry in transcript_parts if start <= entry.start <= end]
@@ -0,0 +1,115 @@
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from pytube import YouTube, extract
+
+from server.logger import get_logger
+from server.services.singleflight import SingleFlight
+from server.services.transcript.cached import TranscriptCache, transcript_cache
+
+logger = get_logger()
+
+# Метка времени главы: 0:00, 03:15, 1:02:30; цифры вокруг не должны продолжать метку (даты, счёт)
+_TIMESTAMP_REGEX = re.compile(r'(?<![\d:])(?:(\d{1,2}):)?(\d{1,2}):(\d{2})(?![\d:])')
+# Разделители между меткой и названием: "00:00 - Вступление", "[00:00] Вступление", "Вступление: 00:00"
+_TITLE_STRIP = ' \t-–—:|.,()[]'
+# Правила YouTube: главы начинаются с 0:00, их не меньше трёх и каждая длится не меньше 10 секунд
+_MIN_CHAPTERS = 3
+_MIN_CHAPTER_LENGTH = 10
+
+
+@dataclass
+class Chapter:
+    """Глава видео: начало и конец в секундах, название из описания"""
+    start: float
+    end: float
+    title: Optional[str] = None
+
+
+_description_flight = SingleFlight()
+
+
+async def get_description(url: str, cache: TranscriptCache = transcript_cache) -> str:
+    """
+    Описание видео, пустая строка если его не удалось получить.
+    Описание хранится в кэше расшифровок по id видео, неудачная загрузка - как пустое описание на negative_ttl.
+    """
+    key = ('description', extract.video_id(url))
+    if (cached := cache.get(key)) is not None:
+        return zlib.decompress(cached).decode()
+    return await _description_flight.do(key, lambda: _fetch_description(url, key, cache))
+
+
+async def _fetch_description(url: str, key: tuple[str, str], cache: TranscriptCache) -> str:
+    try:
+        description = await run_in_threadpool(lambda: YouTube(url).description or '')
+    except Exception as e:
+        logger.warning('Could not get description for %s: %s', url, e)
+        cache.set(key, zlib.compress(b''), cache.negative_ttl)
+        return ''
+    cache.set(key, zlib.compress(description.encode()))
+    return description
+
+
+def parse_chapters(description: str, start: float, end: float) -> list[Chapter]:
+    """
+    Находит главы в описании видео: строки с меткой времени, остаток строки - название.
+    Как и YouTube, берёт первый подряд идущий список таких строк, который начинается с 0:00,
+    остальные метки в описании ("эфир начнётся в 18:00") - просто упоминания времени,
+    а метки после конца видео отбрасываются обрезкой по end.
+    Главы считаются только если список проходит правила YouTube.
+    Главы обрезаются по [start, end], чтобы совпадать с выбранной частью расшифровки.
+    """
+    marks: list[tuple[int, str]] = []
+    for line in description.splitlines():
+        if not line.strip():
+            continue  # пустые строки между главами список не прерывают
+        if match := _TIMESTAMP_REGEX.search(line):
+            hours, minutes, seconds = (int(group or 0) for group in match.groups())
+            title = (line[:match.start()] + ' ' + line[match.end():]).strip(_TITLE_STRIP)
+            mark = hours * 3600 + minutes * 60 + seconds
+            if marks and mark <= marks[-1][0]:
+                break  # время назад - список глав закончился, дальше другие метки
+            if marks or mark == 0:
+                marks.append((mark, ' '.join(title.split())))
+        elif marks:
+            break
+
+    if len(marks) < _MIN_CHAPTERS:
+        return []
+    if any(next_start - chapter_start < _MIN_CHAPTER_LENGTH
+           for (chapter_start, _), (next_start, _) in zip(marks, marks[1:])):
+        return []
+
+    chapters = []
+    for index, (chapter_start, title) in enumerate(marks):
+        chapter_end = marks[index + 1][0] if index + 1 < len(marks) else end
+        if chapter_end <= start or chapter_start >= end:
+            continue
+        chapters.append(Chapter(max(chapter_start, start), min(chapter_end, end), title or None))
+    return chapters
+
+
+def fit_chapters(chapters: list[Chapter], number_of_topics: int) -> list[Chapter]:
+    """
+    Подгоняет количество глав под количество тем.
+    Лишние главы сливаются с соседними по самой короткой паре, названия объединяются.
+    Недостающие темы получаются делением самой длинной главы пополам,
+    название остаётся у первой половины, вторую назовёт языковая модель.
+    """
+    chapters = list(chapters)
+    number_of_topics = max(1, number_of_topics)
+    while len(chapters) > number_of_topics:
+        index = min(range(len(chapters) - 1), key=lambda i: chapters[i + 1].end - chapters[i].start)
+        first, second = chapters[index], chapters[index + 1]
+        titles = [title for title in (first.title, second.title) if title]
+        chapters[index:index + 2] = [Chapter(first.start, second.end, ' / '.join(titles) or None)]
+    while len(chapters) < number_of_topics:
+        index = max(range(len(chapters)), key=lambda i: chapters[i].end - chapters[i].start)
+        chapter = chapters[index]
+        middle = (chapter.start + chapter.end) / 2
+        chapters[index:index + 1] = [Chapter(chapter.start, middle, chapter.title), Chapter(middle, chapter.end)]
+    return chapters
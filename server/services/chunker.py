@@ -0,0 +1,64 @@
+from collections import deque
+
+from server.services.g4f.models import ModelUtils
+
+# Средняя длина токена в символах: латиница кодируется примерно 4 символами на токен,
+# кириллица и прочие не-ASCII символы - примерно 2
+_ASCII_CHARS_PER_TOKEN = 4
+_NON_ASCII_CHARS_PER_TOKEN = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Оценивает количество токенов в тексте за один проход.
+    Кириллица занимает 2 байта в utf-8, поэтому разница длины в байтах и символах
+    даёт количество не-ASCII символов без посимвольного цикла на Python.
+    """
+    if text.isascii():
+        return -(-len(text) // _ASCII_CHARS_PER_TOKEN)
+    non_ascii = min(len(text.encode('utf-8')) - len(text), len(text))
+    ascii_chars = len(text) - non_ascii
+    return -(-ascii_chars // _ASCII_CHARS_PER_TOKEN) + -(-non_ascii // _NON_ASCII_CHARS_PER_TOKEN)
+
+
+def token_budget(model: str, system: str, response_tokens: int) -> int:
+    """Сколько токенов пользовательского сообщения помещается в контекст модели"""
+    context_window = ModelUtils.convert[model].context_window
+    return context_window - estimate_tokens(system) - response_tokens
+
+
+def chunk_offsets(
+        text: str,
+        budget: int,
+        overlap: int = 0,
+) -> list[tuple[int, int]]:
+    """
+    Делит текст по строкам (одна строка - одна строка расшифровки) на куски,
+    каждый из которых укладывается в бюджет токенов.
+    Соседние куски перекрываются последними строками предыдущего куска
+    суммарно не больше чем на overlap токенов.
+    Возвращает пары (начало, конец) для срезов исходной строки.
+    """
+    offsets = []
+    chunk_lines: deque[tuple[int, int]] = deque()  # (начало строки, токены строки)
+    chunk_tokens = 0
+    position = 0
+    length = len(text)
+
+    while position < length:
+        line_end = text.find('\n', position)
+        line_end = length if line_end == -1 else line_end + 1
+        line_tokens = estimate_tokens(text[position:line_end])
+
+        if chunk_lines and chunk_tokens + line_tokens > budget:
+            offsets.append((chunk_lines[0][0], position))
+            while chunk_lines and (chunk_tokens > overlap or chunk_tokens + line_tokens > budget):
+                chunk_tokens -= chunk_lines.popleft()[1]
+
+        chunk_lines.append((position, line_tokens))
+        chunk_tokens += line_tokens
+        position = line_end
+
+    if chunk_lines:
+        offsets.append((chunk_lines[0][0], length))
+    return offsets
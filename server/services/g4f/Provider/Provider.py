@@ -1,5 +1,8 @@
 import os
-from ..typing import sha256, Dict, get_type_hints
+
+from aiohttp import ClientSession
+
+from ..typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = None
 model = None
@@ -7,10 +10,12 @@ supports_stream = False
 needs_auth = False
 
 
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:
     return
+    yield
 
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
     '(%s)' % ', '.join(
-        [f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
+        [f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
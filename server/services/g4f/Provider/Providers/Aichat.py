@@ -1,14 +1,15 @@
-import requests
 import os
 import json
-from ...typing import sha256, Dict, get_type_hints
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://hteyun.com'
 model = ['gpt-3.5-turbo', 'gpt-3.5-turbo-16k', 'gpt-3.5-turbo-16k-0613', 'gpt-3.5-turbo-0613']
 supports_stream = True
 needs_auth = False
 
-def _create_completion(model: str, messages: list, stream: bool, temperature: float = 0.7, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            temperature: float = 0.7, **kwargs) -> AsyncIterator[str]:
     headers = {
         'Content-Type': 'application/json',
     }
@@ -18,18 +19,16 @@ def _create_completion(model: str, messages: list, stream: bool, temperature: fl
         'presence_penalty': 0,
         'messages': messages,
     }
-    response = requests.post(url + '/api/chat-stream',
-                             json=data, stream=True)
-    
-    if stream:
-        for chunk in response.iter_content(chunk_size=None):
-            chunk = chunk.decode('utf-8')
-            if chunk.strip():
-                message = json.loads(chunk)['choices'][0]['message']['content']
-                yield message
-    else:
-        message = response.json()['choices'][0]['message']['content']
-        yield message
+    async with session.post(url + '/api/chat-stream', json=data) as response:
+        if stream:
+            async for chunk in response.content.iter_any():
+                chunk = chunk.decode('utf-8')
+                if chunk.strip():
+                    message = json.loads(chunk)['choices'][0]['message']['content']
+                    yield message
+        else:
+            response_json = await response.json(content_type=None)
+            yield response_json['choices'][0]['message']['content']
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
-    '(%s)' % ', '.join([f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
\ No newline at end of file
+    '(%s)' % ', '.join([f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
\ No newline at end of file
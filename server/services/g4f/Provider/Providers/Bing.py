@@ -9,8 +9,8 @@ import certifi
 import aiohttp
 import asyncio
 
-import requests
-from ...typing import sha256, Dict, get_type_hints
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://bing.com/chat'
 model = ['gpt-4']
@@ -118,9 +118,9 @@ def _format(msg: dict) -> str:
     return json.dumps(msg, ensure_ascii=False) + Defaults.delimiter
 
 
-async def create_conversation():
+async def create_conversation(session: ClientSession):
     for _ in range(5):
-        create = requests.get('https://www.bing.com/turing/conversation/create',
+        async with session.get('https://www.bing.com/turing/conversation/create',
                               headers={
                                   'authority': 'edgeservices.bing.com',
                                   'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -143,11 +143,12 @@ async def create_conversation():
                                   'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36 Edg/110.0.1587.69',
                                   'x-edge-shopping-flag': '1',
                                   'x-forwarded-for': Defaults.ip_address
-                              })
+                              }) as create:
+            create_json = await create.json(content_type=None)
 
-        conversationId = create.json().get('conversationId')
-        clientId = create.json().get('clientId')
-        conversationSignature = create.json().get('conversationSignature')
+        conversationId = create_json.get('conversationId')
+        clientId = create_json.get('clientId')
+        conversationSignature = create_json.get('conversationSignature')
 
         if not conversationId or not clientId or not conversationSignature and _ == 4:
             raise Exception('Failed to create conversation.')
@@ -155,11 +156,9 @@ async def create_conversation():
         return conversationId, clientId, conversationSignature
 
 
-async def stream_generate(prompt: str, mode: optionsSets.optionSet = optionsSets.jailbreak, context: bool or str = False):
-    timeout = aiohttp.ClientTimeout(total=900)
-    session = aiohttp.ClientSession(timeout=timeout)
-
-    conversationId, clientId, conversationSignature = await create_conversation()
+async def stream_generate(session: ClientSession, prompt: str, mode: optionsSets.optionSet = optionsSets.jailbreak,
+                          context: bool or str = False):
+    conversationId, clientId, conversationSignature = await create_conversation(session)
 
     wss = await session.ws_connect('wss://sydney.bing.com/sydney/ChatHub', ssl=ssl_context, autoping=False,
                                    headers={
@@ -270,8 +269,6 @@ async def stream_generate(prompt: str, mode: optionsSets.optionSet = optionsSets
                         final = True
                         if wss and not wss.closed:
                             await wss.close()
-                        if session and not session.closed:
-                            await session.close()
                             
                     yield (resp_txt.replace(cache_text, ''))
                     cache_text = resp_txt
@@ -280,8 +277,6 @@ async def stream_generate(prompt: str, mode: optionsSets.optionSet = optionsSets
                 if response['item']['result'].get('error'):
                     if wss and not wss.closed:
                         await wss.close()
-                    if session and not session.closed:
-                        await session.close()
 
                     raise Exception(
                         f"{response['item']['result']['value']}: {response['item']['result']['message']}")
@@ -300,23 +295,7 @@ async def stream_generate(prompt: str, mode: optionsSets.optionSet = optionsSets
                 final = True
                 if wss and not wss.closed:
                     await wss.close()
-                if session and not session.closed:
-                    await session.close()
-
-
-def run(generator):  
-    loop = asyncio.new_event_loop()  
-    asyncio.set_event_loop(loop)  
-    gen = generator.__aiter__()  
-
-    while True:  
-        try:  
-            next_val = loop.run_until_complete(gen.__anext__())  
-            yield next_val  
 
-        except StopAsyncIteration:  
-            break  
-    #print('Done')  
 
 def convert(messages):
     context = ""
@@ -328,7 +307,8 @@ def convert(messages):
     return context
 
 
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:
     if len(messages) < 2:
         prompt = messages[0]['content']
         context = False
@@ -337,8 +317,7 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         prompt = messages[-1]['content']
         context = convert(messages[:-1])
 
-    response = run(stream_generate(prompt, optionsSets.jailbreak, context))
-    for token in response:
+    async for token in stream_generate(session, prompt, optionsSets.jailbreak, context):
         yield (token)
 
     #print('Done')
@@ -346,4 +325,4 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
     '(%s)' % ', '.join(
-        [f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
+        [f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
@@ -1,21 +1,24 @@
 import os
-import requests, re
-from ...typing import sha256, Dict, get_type_hints
+import re
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://chatgpt.ai/gpt-4/'
 model = ['gpt-4']
 supports_stream = True
 needs_auth = False
 
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:
     chat = ''
     for message in messages:
         chat += '%s: %s\n' % (message['role'], message['content'])
     chat += 'assistant: '
 
-    response = requests.get('https://chatgpt.ai/gpt-4/')
+    async with session.get('https://chatgpt.ai/gpt-4/') as response:
+        page = await response.text()
 
-    nonce, post_id, _, bot_id = re.findall(r'data-nonce="(.*)"\n     data-post-id="(.*)"\n     data-url="(.*)"\n     data-bot-id="(.*)"\n     data-width', response.text)[0]
+    nonce, post_id, _, bot_id = re.findall(r'data-nonce="(.*)"\n     data-post-id="(.*)"\n     data-url="(.*)"\n     data-bot-id="(.*)"\n     data-width', page)[0]
 
     headers = {
         'authority': 'chatgpt.ai',
@@ -42,10 +45,11 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         'bot_id': bot_id
     }
 
-    response = requests.post('https://chatgpt.ai/wp-admin/admin-ajax.php', 
-                            headers=headers, data=data)
+    async with session.post('https://chatgpt.ai/wp-admin/admin-ajax.php', 
+                            headers=headers, data=data) as response:
+        response_json = await response.json(content_type=None)
 
-    yield (response.json()['data'])
+    yield (response_json['data'])
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
-    '(%s)' % ', '.join([f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
\ No newline at end of file
+    '(%s)' % ', '.join([f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
\ No newline at end of file
@@ -1,6 +1,6 @@
 import os
-from ...typing import sha256, Dict, get_type_hints
-import requests
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 import re
 import base64
 
@@ -10,14 +10,16 @@ supports_stream = False
 needs_auth = False
 
 
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):
-    def get_nonce():
-        res = requests.get('https://chatgptlogin.ac/use-chatgpt-free/', headers={
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:
+    async def get_nonce():
+        async with session.get('https://chatgptlogin.ac/use-chatgpt-free/', headers={
             "Referer": "https://chatgptlogin.ac/use-chatgpt-free/",
             "User-Agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
-        })
+        }) as res:
+            page = await res.text()
 
-        src = re.search(r'class="mwai-chat mwai-chatgpt">.*<span>Send</span></button></div></div></div> <script defer src="(.*?)">', res.text).group(1)
+        src = re.search(r'class="mwai-chat mwai-chatgpt">.*<span>Send</span></button></div></div></div> <script defer src="(.*?)">', page).group(1)
         decoded_string = base64.b64decode(src.split(",")[-1]).decode('utf-8')
         return re.search(r"let restNonce = '(.*?)';", decoded_string).group(1)
     
@@ -60,7 +62,7 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         'sec-fetch-mode': 'cors',
         'sec-fetch-site': 'same-origin',
         'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36',
-        'x-wp-nonce': get_nonce()
+        'x-wp-nonce': await get_nonce()
     }
     
     conversation = transform(messages)
@@ -85,12 +87,13 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         'clientId': os.urandom(6).hex()
     }
 
-    response = requests.post('https://chatgptlogin.ac/wp-json/ai-chatbot/v1/chat', 
-                             headers=headers, json=json_data)
+    async with session.post('https://chatgptlogin.ac/wp-json/ai-chatbot/v1/chat', 
+                            headers=headers, json=json_data) as response:
+        response_json = await response.json(content_type=None)
     
-    return response.json()['reply']
+    yield response_json['reply']
 
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
     '(%s)' % ', '.join(
-        [f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
+        [f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
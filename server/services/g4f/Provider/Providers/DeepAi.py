@@ -1,17 +1,20 @@
 import os
 import json
+import codecs
 import random
 import hashlib
-import requests
 
-from ...typing import sha256, Dict, get_type_hints
+from aiohttp import ClientSession, MultipartWriter
+
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://deepai.org'
 model = ['gpt-3.5-turbo']
 supports_stream = True
 needs_auth = False
 
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:
     def md5(text: str) -> str:
         return hashlib.md5(text.encode()).hexdigest()[::-1]
 
@@ -29,18 +32,18 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         "user-agent": user_agent
     }
 
-    files = {
-        "chat_style": (None, "chat"),
-        "chatHistory": (None, json.dumps(messages))
-    }
-
-    r = requests.post("https://api.deepai.org/chat_response", headers=headers, files=files, stream=True)
+    files = MultipartWriter('form-data')
+    for name, value in (("chat_style", "chat"), ("chatHistory", json.dumps(messages))):
+        part = files.append(value)
+        part.set_content_disposition('form-data', name=name)
 
-    for chunk in r.iter_content(chunk_size=None):
+    async with session.post("https://api.deepai.org/chat_response", headers=headers, data=files) as r:
         r.raise_for_status()
-        yield chunk.decode()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        async for chunk in r.content.iter_any():
+            yield decoder.decode(chunk)
 
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
     '(%s)' % ', '.join(
-        [f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
+        [f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
@@ -1,7 +1,7 @@
 import os  
 import json
-import requests  
-from typing import Dict, get_type_hints  
+from aiohttp import ClientSession
+from typing import AsyncIterator, Dict, get_type_hints  
   
 url = 'https://ai.fakeopen.com/v1/'  
 model = [  
@@ -15,7 +15,8 @@ supports_stream = True
 needs_auth = False  
   
   
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):  
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:  
   
     headers = {  
         'Content-Type': 'application/json',  
@@ -32,23 +33,22 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         'stream': stream,  
     }  
   
-    response = requests.post(  
-        'https://ai.fakeopen.com/v1/chat/completions', headers=headers, json=json_data, stream=True  
-    )  
-  
-    for token in response.iter_lines():  
-        decoded = token.decode('utf-8')  
-        if decoded == '[DONE]':  
-            break  
-        if decoded.startswith('data: '):  
-            data_str = decoded.replace('data: ', '')  
-            if data_str != '[DONE]':  
-                data = json.loads(data_str)  
-                if 'choices' in data and 'delta' in data['choices'][0] and 'content' in data['choices'][0]['delta']:  
-                    yield data['choices'][0]['delta']['content']  
+    async with session.post(  
+        'https://ai.fakeopen.com/v1/chat/completions', headers=headers, json=json_data  
+    ) as response:  
+        async for token in response.content:  
+            decoded = token.decode('utf-8').strip()  
+            if decoded == '[DONE]':  
+                break  
+            if decoded.startswith('data: '):  
+                data_str = decoded.replace('data: ', '')  
+                if data_str != '[DONE]':  
+                    data = json.loads(data_str)  
+                    if 'choices' in data and 'delta' in data['choices'][0] and 'content' in data['choices'][0]['delta']:  
+                        yield data['choices'][0]['delta']['content']  
 
 
   
   
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' +  '(%s)' % ', '.join(  
-        [f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])  
+        [f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])  
@@ -1,14 +1,15 @@
 import os
 import json
-import requests
-from ...typing import sha256, Dict, get_type_hints
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://forefront.com'
 model = ['gpt-3.5-turbo']
 supports_stream = True
 needs_auth = False
 
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:
     json_data = {
         'text': messages[-1]['content'],
         'action': 'noauth',
@@ -20,11 +21,11 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         'messages': messages[:-1] if len(messages) > 1 else [],
         'internetMode': 'auto'
     }
-    response = requests.post( 'https://streaming.tenant-forefront-default.knative.chi.coreweave.com/free-chat',
-        json=json_data, stream=True)
-    for token in response.iter_lines(): 
-        if b'delta' in token:
-            token = json.loads(token.decode().split('data: ')[1])['delta']
-            yield (token)
+    async with session.post( 'https://streaming.tenant-forefront-default.knative.chi.coreweave.com/free-chat',
+        json=json_data) as response:
+        async for token in response.content: 
+            if b'delta' in token:
+                token = json.loads(token.decode().split('data: ')[1])['delta']
+                yield (token)
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
-    '(%s)' % ', '.join([f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
\ No newline at end of file
+    '(%s)' % ', '.join([f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
\ No newline at end of file
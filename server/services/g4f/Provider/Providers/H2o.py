@@ -1,10 +1,9 @@
-from requests import Session
 from uuid import uuid4
 from json import loads
 import os
 import json
-import requests
-from ...typing import sha256, Dict, get_type_hints
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://gpt-gm.h2o.ai'
 model = ['falcon-40b', 'falcon-7b', 'llama-13b']
@@ -17,14 +16,14 @@ models = {
     'llama-13b': 'h2oai/h2ogpt-gm-oasst1-en-2048-open-llama-13b'
 }
 
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:
     conversation = 'instruction: this is a conversation beween, a user and an AI assistant, respond to the latest message, referring to the conversation if needed\n'
     for message in messages:
         conversation += '%s: %s\n' % (message['role'], message['content'])
     conversation += 'assistant:'
     
-    client = Session()
-    client.headers = {
+    client_headers = {
         'authority': 'gpt-gm.h2o.ai',
         'origin': 'https://gpt-gm.h2o.ai',
         'referer': 'https://gpt-gm.h2o.ai/',
@@ -39,14 +38,16 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36',
     }
 
-    client.get('https://gpt-gm.h2o.ai/')
-    response = client.post('https://gpt-gm.h2o.ai/settings', data={
+    async with session.get('https://gpt-gm.h2o.ai/', headers=client_headers) as response:
+        await response.read()
+    async with session.post('https://gpt-gm.h2o.ai/settings', headers=client_headers, data={
         'ethicsModalAccepted': 'true',
         'shareConversationsWithModelAuthors': 'true',
         'ethicsModalAcceptedAt': '',
         'activeModel': 'h2oai/h2ogpt-gm-oasst1-en-2048-falcon-40b-v1',
         'searchEnabled': 'true',
-    })
+    }) as response:
+        await response.read()
 
     headers = {
         'authority': 'gpt-gm.h2o.ai',
@@ -67,12 +68,12 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         'model': models[model]
     }
 
-    response = client.post('https://gpt-gm.h2o.ai/conversation',
-                            headers=headers, json=json_data)
-    conversationId = response.json()['conversationId']
+    async with session.post('https://gpt-gm.h2o.ai/conversation',
+                            headers=headers, json=json_data) as response:
+        conversationId = (await response.json(content_type=None))['conversationId']
 
 
-    completion = client.post(f'https://gpt-gm.h2o.ai/conversation/{conversationId}', stream=True, json = {
+    async with session.post(f'https://gpt-gm.h2o.ai/conversation/{conversationId}', headers=client_headers, json = {
         'inputs': conversation,
         'parameters': {
             'temperature': kwargs.get('temperature', 0.4),
@@ -90,17 +91,16 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
             'use_cache': False,
             'web_search_id': ''
         }
-    })
-
-    for line in completion.iter_lines():
-        if b'data' in line:
-            line = loads(line.decode('utf-8').replace('data:', ''))
-            token = line['token']['text']
-            
-            if token == '<|endoftext|>':
-                break
-            else:
-                yield (token)
+    }) as completion:
+        async for line in completion.content:
+            if b'data' in line:
+                line = loads(line.decode('utf-8').replace('data:', ''))
+                token = line['token']['text']
+                
+                if token == '<|endoftext|>':
+                    break
+                else:
+                    yield (token)
             
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
-    '(%s)' % ', '.join([f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
\ No newline at end of file
+    '(%s)' % ', '.join([f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
\ No newline at end of file
@@ -1,5 +1,6 @@
-import os, uuid, requests
-from ...typing import sha256, Dict, get_type_hints
+import os, uuid
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://liaobots.com'
 model = ['gpt-4-0613']
@@ -15,7 +16,8 @@ models = {
     }
 }
 
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:
 
     print(kwargs)
 
@@ -37,11 +39,10 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         'prompt': "You are ChatGPT, a large language model trained by OpenAI. Follow the user's instructions carefully. Respond using markdown.",
     }
 
-    response = requests.post('https://liaobots.com/api/chat', 
-                             headers=headers, json=json_data, stream=True)
-
-    for token in response.iter_content(chunk_size=2046):
-        yield (token.decode('cp1251'))
+    async with session.post('https://liaobots.com/api/chat', 
+                            headers=headers, json=json_data) as response:
+        async for token in response.content.iter_chunked(2046):
+            yield (token.decode('cp1251'))
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
-    '(%s)' % ', '.join([f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
\ No newline at end of file
+    '(%s)' % ', '.join([f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
\ No newline at end of file
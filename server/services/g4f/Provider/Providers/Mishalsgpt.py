@@ -1,12 +1,14 @@
-import os, requests, uuid
-from ...typing import sha256, Dict, get_type_hints
+import os, uuid
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://mishalsgpt.vercel.app'
 model = ['gpt-3.5-turbo-16k-0613', 'gpt-3.5-turbo']
 supports_stream = True
 needs_auth = False
 
-def _create_completion(model: str, messages: list, stream: bool, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            **kwargs) -> AsyncIterator[str]:
     headers = {
         'Content-Type': 'application/json',
     }
@@ -15,9 +17,10 @@ def _create_completion(model: str, messages: list, stream: bool, **kwargs):
         'temperature': 0.7,
         'messages': messages
     }
-    response = requests.post(url + '/api/openai/v1/chat/completions', 
-                             headers=headers, json=data, stream=True)
-    yield response.json()['choices'][0]['message']['content']
+    async with session.post(url + '/api/openai/v1/chat/completions', 
+                            headers=headers, json=data) as response:
+        response_json = await response.json(content_type=None)
+    yield response_json['choices'][0]['message']['content']
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
-    '(%s)' % ', '.join([f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
+    '(%s)' % ', '.join([f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
@@ -1,14 +1,16 @@
-import requests
 import os
 import json
-from ...typing import sha256, Dict, get_type_hints
+import codecs
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://api.gptplus.one'
 model = ['gpt-3.5-turbo', 'gpt-3.5-turbo-16k', 'gpt-3.5-turbo-16k-0613', 'gpt-3.5-turbo-0613']
 supports_stream = True
 needs_auth = False
 
-def _create_completion(model: str, messages: list, stream: bool, temperature: float = 0.7, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            temperature: float = 0.7, **kwargs) -> AsyncIterator[str]:
     headers = {
         'Content-Type': 'application/json',
         'Accept': '*/*',
@@ -18,12 +20,13 @@ def _create_completion(model: str, messages: list, stream: bool, temperature: fl
         'messages': messages,
         'model': model,
     }
-    response = requests.post('https://api.gptplus.one/chat-process', json=data, stream=True)
-    print(response)
+    async with session.post('https://api.gptplus.one/chat-process', json=data) as response:
+        print(response)
 
-    for token in response.iter_content(chunk_size=None):
-        yield (token.decode('utf-8'))
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        async for token in response.content.iter_any():
+            yield (decoder.decode(token))
 
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
-    '(%s)' % ', '.join([f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
+    '(%s)' % ', '.join([f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
@@ -1,8 +1,9 @@
 import os
 import time
-import requests
+import codecs
 
-from ...typing import sha256, Dict, get_type_hints
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 url = 'https://chat9.yqcloud.top/'
 model = [
     'gpt-3.5-turbo',
@@ -11,7 +12,8 @@ supports_stream = True
 needs_auth = False
 
 
-def _create_completion(model: str, messages: list, stream: bool, chatId: str, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            chatId: str, **kwargs) -> AsyncIterator[str]:
 
     headers = {
         'authority': 'api.aichatos.cloud',
@@ -28,12 +30,13 @@ def _create_completion(model: str, messages: list, stream: bool, chatId: str, **
         'system': '',
         'withoutContext': False,
     }
-    response = requests.post('https://api.aichatos.cloud/api/generateStream',
-                             headers=headers, json=json_data, stream=True)
-    for token in response.iter_content(chunk_size=2046):
-        yield (token.decode('utf-8'))
+    async with session.post('https://api.aichatos.cloud/api/generateStream',
+                            headers=headers, json=json_data) as response:
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        async for token in response.content.iter_chunked(2046):
+            yield (decoder.decode(token))
 
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
     '(%s)' % ', '.join(
-        [f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
\ No newline at end of file
+        [f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
\ No newline at end of file
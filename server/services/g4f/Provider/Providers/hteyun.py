@@ -1,14 +1,15 @@
-import requests
 import os
 import json
-from ...typing import sha256, Dict, get_type_hints
+from aiohttp import ClientSession
+from ...typing import sha256, Dict, AsyncIterator, get_type_hints
 
 url = 'https://hteyun.com'
 model = ['gpt-3.5-turbo', 'gpt-3.5-turbo-16k', 'gpt-3.5-turbo-16k-0613', 'gpt-3.5-turbo-0613']
 supports_stream = True
 needs_auth = False
 
-def _create_completion(model: str, messages: list, stream: bool, temperature: float = 0.7, **kwargs):
+async def create_completion(model: str, messages: list, stream: bool, session: ClientSession,
+                            temperature: float = 0.7, **kwargs) -> AsyncIterator[str]:
     headers = {
         'Content-Type': 'application/json',
         'Accept': 'application/json, text/plain, */*',
@@ -23,12 +24,13 @@ def _create_completion(model: str, messages: list, stream: bool, temperature: fl
         'temperature': 0.7,
         'presence_penalty': 0,
     }
-    response = requests.post(url + '/api/chat-stream', json=data, headers=headers, stream=True)
-    print(response.json())
+    async with session.post(url + '/api/chat-stream', json=data, headers=headers) as response:
+        response_json = await response.json(content_type=None)
+    print(response_json)
 
     # Извлечение текста из response
-    return response.json()['text']
+    yield response_json['text']
 
 
 params = f'g4f.Providers.{os.path.basename(__file__)[:-3]} supports: ' + \
-    '(%s)' % ', '.join([f"{name}: {get_type_hints(_create_completion)[name].__name__}" for name in _create_completion.__code__.co_varnames[:_create_completion.__code__.co_argcount]])
+    '(%s)' % ', '.join([f"{name}: {get_type_hints(create_completion)[name].__name__}" for name in create_completion.__code__.co_varnames[:create_completion.__code__.co_argcount]])
@@ -1,6 +1,10 @@
+import asyncio
 import sys
 
+from aiohttp import ClientSession
+
 from server.services.g4f.models import Model, ModelUtils
+from server.services.g4f.typing import AsyncIterator
 from . import Provider
 
 
@@ -8,7 +12,7 @@ class ChatCompletion:
     @staticmethod
     async def create(model: Model.model or str, messages: list, provider: Provider.Provider = None,
                      stream: bool = False,
-                     auth: str = False, **kwargs):
+                     auth: str = False, session: ClientSession = None, **kwargs):
         kwargs['auth'] = auth
 
         if provider and provider.needs_auth and not auth:
@@ -33,11 +37,41 @@ class ChatCompletion:
 
             print(f'Using {engine.__name__} provider')
 
-            return (engine._create_completion(model.name, messages, stream, **kwargs)
-                    if stream else ''.join(engine._create_completion(model.name, messages, stream, **kwargs)))
+            completion = _completion(engine, model.name, messages, stream, session, **kwargs)
+            return completion if stream else ''.join([token async for token in completion])
         except TypeError as e:
             print(e)
             arg: str = str(e).split("'")[1]
             print(
                 f"ValueError: {engine.__name__} does not support '{arg}' argument", file=sys.stderr)
             sys.exit(1)
+
+
+async def _completion(engine, model: str, messages: list, stream: bool, session: ClientSession = None,
+                      **kwargs) -> AsyncIterator[str]:
+    """
+    Токены ответа провайдера без блокировки цикла событий.
+    Провайдеры на aiohttp работают на соединениях session, но каждый вызов получает свои cookie,
+    синхронные провайдеры перебираются в отдельном потоке.
+    """
+    if hasattr(engine, 'create_completion'):
+        if session is None:
+            call_session = ClientSession()
+        else:
+            call_session = ClientSession(
+                connector=session.connector,
+                connector_owner=False,
+                timeout=session.timeout,
+            )
+        async with call_session:
+            async for token in engine.create_completion(model, messages, stream, session=call_session, **kwargs):
+                yield token
+        return
+
+    tokens = engine._create_completion(model, messages, stream, **kwargs)
+    if isinstance(tokens, str):
+        yield tokens
+        return
+    sentinel = object()
+    while (token := await asyncio.to_thread(next, tokens, sentinel)) is not sentinel:
+        yield token
@@ -7,48 +7,57 @@ class Model:
     class model:
         name: str
         base_provider: str
+        context_window: int
         best_provider: str
 
     class gpt_35_turbo:
         name: str = 'gpt-3.5-turbo'
         base_provider: str = 'openai'
+        context_window: int = 4096
         best_provider: Provider.Provider = random.choice([Provider.DeepAi, Provider.Easychat])
 
     class gpt_35_turbo_0613:
         name: str = 'gpt-3.5-turbo-0613'
         base_provider: str = 'openai'
+        context_window: int = 4096
         best_provider: Provider.Provider = random.choice([Provider.Easychat])
 
     class gpt_35_turbo_16k_0613:
         name: str = 'gpt-3.5-turbo-16k-0613'
         base_provider: str = 'openai'
+        context_window: int = 16384
         best_provider: Provider.Provider = random.choice([Provider.Easychat])
 
     class gpt_35_turbo_16k:
         name: str = 'gpt-3.5-turbo-16k'
         base_provider: str = 'openai'
+        context_window: int = 16384
         best_provider: Provider.Provider = random.choice([Provider.Easychat])
 
     class gpt_4_dev:
         name: str = 'gpt-4-for-dev'
         base_provider: str = 'openai'
+        context_window: int = 8192
         best_provider: Provider.Provider = Provider.Phind
 
     class gpt_4:
         name: str = 'gpt-4'
         base_provider: str = 'openai'
+        context_window: int = 8192
         best_provider: Provider.Provider = Provider.Lockchat
         best_providers: list = [Provider.Bing, Provider.Lockchat]
 
     class gpt_4_0613:
         name: str = 'gpt-4-0613'
         base_provider: str = 'openai'
+        context_window: int = 8192
         best_provider: Provider.Provider = Provider.Lockchat
         best_providers: list = [Provider.Bing, Provider.Lockchat]
 
     class palm:
         name: str = 'palm2'
         base_provider: str = 'google'
+        context_window: int = 8192
         best_provider: Provider.Provider = Provider.Bard
 
     """    'falcon-40b': Model.falcon_40b,
@@ -58,16 +67,19 @@ class Model:
     class falcon_40b:
         name: str = 'falcon-40b'
         base_provider: str = 'huggingface'
+        context_window: int = 2048
         best_provider: Provider.Provider = Provider.H2o
 
     class falcon_7b:
         name: str = 'falcon-7b'
         base_provider: str = 'huggingface'
+        context_window: int = 2048
         best_provider: Provider.Provider = Provider.H2o
 
     class llama_13b:
         name: str = 'llama-13b'
         base_provider: str = 'huggingface'
+        context_window: int = 2048
         best_provider: Provider.Provider = Provider.H2o
 
 
@@ -1,3 +1,3 @@
-from typing import Dict, NewType, Union, Optional, List, get_type_hints
+from typing import AsyncIterator, Dict, NewType, Union, Optional, List, get_type_hints
 
-sha256 = NewType('sha_256_hash', str)
\ No newline at end of file
+sha256 = NewType('sha_256_hash', str)
@@ -1,17 +1,35 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import json
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 import server.services.g4f as g4f
+from server.config import settings
 from server.logger import get_logger
+from server.services.chunker import chunk_offsets, estimate_tokens, token_budget
+from server.services.llm_cache import cache_key, llm_cache
+from server.services.singleflight import SingleFlight
 
 if TYPE_CHECKING:
     from aiohttp import ClientSession
 
 logger = get_logger()
 
+MODEL = "gpt-3.5-turbo-16k-0613"
+# Сколько токенов оставить под JSON с заголовком и темами в ответе
+TITLE_RESPONSE_TOKENS = 2048
+
+# Одинаковые запросы к модели из одновременных генераций статей выполняются один раз
+_completion_flight = SingleFlight()
+
+
+def completions_in_flight() -> int:
+    """Сколько разных запросов к модели выполняется сейчас"""
+    return _completion_flight.in_flight()
+
+
 PROMPT = """
 Choose a title and description for video subtitles and break subtitles into small topics which should cover the entire subtitles.
 You will receive subtitles in the following format (start - video subtitles):
@@ -42,75 +60,207 @@ Respond in russian language. Response template:
 Substitude [hh:mm:ss - hh:mm:ss] with time, for example [00:01:22 - 00:01:35] and [generated sentences] with generated sentence. Do not provide text that does not fit the template.
 """
 
+SUMMARY_PROMPT = """
+Choose a title and description for video subtitles.
+You will receive subtitles in the following format (start - video subtitles):
+hh:mm:ss - subtitles
+hh:mm:ss - subtitles
+...
+
+Respond with valid JSON in the following format (Substitude text in [square brackets]):
+{"title": "[title]", "description": "[summarize what was said in the subtitles]"}
+On russian language."""
+
+
+REDUCE_PROMPT = """
+You will receive titles and descriptions of consecutive parts of one video in the following format:
+[title] - [description]
+[title] - [description]
+...
+
+Choose one title and description for the whole video.
+Respond with valid JSON in the following format (Substitude text in [square brackets]):
+{"title": "[title]", "description": "[summarize what was said in all parts]"}
+On russian language."""
+
 
 async def gpt_title_request(
         system: str,
         user: str,
         session: ClientSession,
+        bypass_cache: bool = False,
 ) -> dict:
-    content = {
-        "title": None,
-        "description": None,
-        "topics": [],
+    budget = token_budget(MODEL, system, TITLE_RESPONSE_TOKENS)
+    request_query = chunk_offsets(user, budget, settings.llm_chunk_overlap_tokens)
+
+    # map: темы по каждому куску субтитров запрашиваются параллельно, порядок сохраняется
+    semaphore = asyncio.Semaphore(settings.llm_chunk_concurrency)
+    partials = await asyncio.gather(*[
+        _title_chunk_request(system, user[start:end], session, semaphore, bypass_cache) for start, end in request_query
+    ])
+
+    # reduce: заголовок и описание собираются по итогам всех кусков
+    summaries = [partial for partial in partials if partial['title'] and partial['description']]
+    title, description = await _reduce_summaries(summaries, session, semaphore, bypass_cache)
+    return {
+        "title": title,
+        "description": description,
+        "topics": [topic for partial in partials for topic in partial['topics']],
     }
 
-    if len(user) > 12000:
-        request_query = await split_string(user, 12000)
-    else:
-        request_query = [user]
-
-    for item in request_query:
-        messages = [
-            {
-                "role": "system",
-                "content": system
-            },
-            {
-                "role": "user",
-                "content": item,
-            },
-        ]
-
-        for event in await g4f.ChatCompletion.create(model="gpt-3.5-turbo-16k-0613", messages=messages, stream=True):
-            try:
-                json_data = try_loads(str(event))
-
-                if not content['title']:
-                    content["title"] = json_data["title"]
-                    content["description"] = json_data["description"]
-                content["topics"] += json_data["topics"]
-            except json.JSONDecodeError:
-                pass
-    return content
+
+async def _title_chunk_request(
+        system: str,
+        user: str,
+        session: ClientSession,
+        semaphore: asyncio.Semaphore,
+        bypass_cache: bool,
+) -> dict:
+    """Запрашивает заголовок, описание и темы для одного куска субтитров"""
+    async with semaphore:
+        response = await _chat_completion(system, user, session, bypass_cache)
+    try:
+        json_data = try_loads(response)
+        return {
+            "title": json_data["title"],
+            "description": json_data["description"],
+            "topics": json_data.get("topics", []),  # в SUMMARY_PROMPT темы не запрашиваются
+        }
+    except (json.JSONDecodeError, KeyError, TypeError):
+        logger.warning('Could not parse title response for subtitles chunk')
+        await _forget_completion(system, user)
+        return {"title": None, "description": None, "topics": []}
+
+
+async def _reduce_summaries(
+        summaries: list[dict],
+        session: ClientSession,
+        semaphore: asyncio.Semaphore,
+        bypass_cache: bool,
+) -> tuple[Optional[str], Optional[str]]:
+    """
+    Сводит заголовки и описания кусков в один заголовок и описание.
+    Если описаний слишком много для одного запроса (многочасовые видео),
+    сводит их по группам, а затем сводит результаты групп.
+    """
+    if not summaries:
+        return None, None
+    if len(summaries) == 1:
+        return summaries[0]['title'], summaries[0]['description']
+
+    lines = [f"{summary['title']} - {' '.join(summary['description'].split())}" for summary in summaries]
+    budget = token_budget(MODEL, REDUCE_PROMPT, TITLE_RESPONSE_TOKENS)
+    line_tokens = [estimate_tokens(line) + 1 for line in lines]
+    if sum(line_tokens) > budget:
+        groups, group, group_tokens = [], [], 0
+        for summary, tokens in zip(summaries, line_tokens):
+            if group and group_tokens + tokens > budget:
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(summary)
+            group_tokens += tokens
+        groups.append(group)
+        if len(groups) == len(summaries):
+            # описания такие длинные, что в группу попадает только одно: группировка не сократит их число,
+            # поэтому описания обрезаются, чтобы все уместились в один запрос
+            line_budget = budget // len(lines) - 1
+            if line_budget <= 0:
+                return summaries[0]['title'], summaries[0]['description']
+            lines = [_truncate_tokens(line, line_budget) for line in lines]
+        else:
+            reduced = await asyncio.gather(*[
+                _reduce_summaries(group, session, semaphore, bypass_cache) for group in groups
+            ])
+            return await _reduce_summaries(
+                [{"title": title, "description": description} for title, description in reduced if title],
+                session,
+                semaphore,
+                bypass_cache,
+            )
+
+    async with semaphore:
+        response = await _chat_completion(REDUCE_PROMPT, '\n'.join(lines), session, bypass_cache)
+    try:
+        json_data = try_loads(response)
+        return json_data["title"], json_data["description"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        logger.warning('Could not parse reduce response, use summary of the first chunk')
+        await _forget_completion(REDUCE_PROMPT, '\n'.join(lines))
+        return summaries[0]['title'], ' '.join(summary['description'] for summary in summaries)
+
+
+def _truncate_tokens(text: str, tokens: int) -> str:
+    """Обрезает текст, пока его оценка не уложится в tokens"""
+    while (text_tokens := estimate_tokens(text)) > tokens:
+        text = text[:len(text) * tokens // text_tokens]
+    return text
 
 
 async def gpt_topic_request(
         system: str,
         user: str,
         session: ClientSession,
+        bypass_cache: bool = False,
 ) -> str:
-    content = ''
+    # переформатированный текст по объёму сопоставим с исходным, поэтому половина контекста уходит под ответ
+    budget = token_budget(MODEL, system, 0) // 2
+    request_query = chunk_offsets(user, budget, settings.llm_chunk_overlap_tokens)
 
-    if len(user) > 12000:
-        request_query = await split_string(user, 12000)
-    else:
-        request_query = [user]
+    semaphore = asyncio.Semaphore(settings.llm_chunk_concurrency)
+
+    async def request(start: int, end: int) -> str:
+        async with semaphore:
+            return await _chat_completion(system, user[start:end], session, bypass_cache)
+
+    return ''.join(await asyncio.gather(*[request(start, end) for start, end in request_query]))
+
+
+async def _chat_completion(
+        system: str,
+        user: str,
+        session: ClientSession,
+        bypass_cache: bool = False,
+) -> str:
+    """
+    Запрашивает ответ модели через кэш.
+    bypass_cache не читает сохранённый ответ, но сохраняет полученный.
+    Если такой же запрос уже выполняется, ждёт его ответ.
+    """
+    key = cache_key(MODEL, system, user)
+    if settings.llm_cache_enabled and not bypass_cache:
+        if (cached := await llm_cache.get(key)) is not None:
+            return cached
+    return await _completion_flight.do(key, lambda: _request_completion(key, system, user, session))
 
-    for item in request_query:
-        messages = [
-            {
-                "role": "system",
-                "content": system
-            },
-            {
-                "role": "user",
-                "content": item,
-            },
-        ]
 
-        for event in await g4f.ChatCompletion.create(model="gpt-3.5-turbo-16k-0613", messages=messages, stream=True):
-            content += event
-    return content
+async def _request_completion(
+        key: str,
+        system: str,
+        user: str,
+        session: ClientSession,
+) -> str:
+    messages = [
+        {
+            "role": "system",
+            "content": system
+        },
+        {
+            "role": "user",
+            "content": user,
+        },
+    ]
+    # токены читаются здесь, а не внутри ChatCompletion.create: там TypeError превращается в sys.exit
+    completion = await g4f.ChatCompletion.create(model=MODEL, messages=messages, stream=True, session=session)
+    response = ''.join([token async for token in completion])
+    if settings.llm_cache_enabled and response:
+        await llm_cache.set(key, response)
+    return response
+
+
+async def _forget_completion(system: str, user: str) -> None:
+    """Удаляет из кэша ответ, который не удалось разобрать, чтобы следующий запрос спросил модель заново"""
+    if settings.llm_cache_enabled:
+        await llm_cache.delete(cache_key(MODEL, system, user))
 
 
 #
@@ -119,33 +269,22 @@ async def gpt_request(
         system: str,
         user: str,
         session: ClientSession,
+        bypass_cache: bool = False,
 ):
     if system == "title":
         system = PROMPT
-        content = await gpt_title_request(system=system, user=user, session=session)
+        content = await gpt_title_request(system=system, user=user, session=session, bypass_cache=bypass_cache)
+        return content
+    elif system == "summary":
+        system = SUMMARY_PROMPT
+        content = await gpt_title_request(system=system, user=user, session=session, bypass_cache=bypass_cache)
         return content
     else:
         system = TOPIC_PROMPT
-        content = await gpt_topic_request(system=system, user=user, session=session)
+        content = await gpt_topic_request(system=system, user=user, session=session, bypass_cache=bypass_cache)
         return content
 
 
-async def split_string(string, length) -> list[str]:
-    substrings = []
-    start = 0
-    while start < len(string):
-        end = start + length
-        if end >= len(string):
-            end = len(string)
-        else:
-            delimiter_index = string.rfind('\n', start, end)
-            if delimiter_index != -1:
-                end = delimiter_index + 1
-        substrings.append(string[start:end])
-        start = end
-    return substrings
-
-
 def try_loads(json_string: str):
     with contextlib.suppress(json.JSONDecodeError):
         return json.loads(json_string)
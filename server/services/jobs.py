@@ -0,0 +1,100 @@
+import asyncio
+import time
+import uuid
+from typing import Optional
+
+from server.config import settings
+from server.dependencies import http_client, provider_transport
+from server.logger import get_logger
+from server.schemas import Job, JobRequest, JobStatus
+from server.services.articleGenerator import ArticleGenerator
+
+logger = get_logger()
+
+
+class JobQueue:
+    """
+    Очередь задач генерации статей с ограниченным пулом обработчиков.
+    Количество одновременных генераций не зависит от количества HTTP запросов.
+    """
+
+    def __init__(self, workers: int, max_size: int, ttl: float) -> None:
+        self.workers = workers
+        self.max_size = max_size
+        self.ttl = ttl
+        self._jobs: dict[str, Job] = {}
+        self._finished_at: dict[str, float] = {}
+        self._queue: asyncio.Queue[tuple[Job, JobRequest]]
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, request: JobRequest) -> Job:
+        """Ставит запрос в очередь. Если очередь заполнена, выбрасывает asyncio.QueueFull"""
+        self._prune()
+        job = Job(id=uuid.uuid4().hex)
+        self._queue.put_nowait((job, request))
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job, request = await self._queue.get()
+            try:
+                await self._run(job, request)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job, request: JobRequest) -> None:
+        job.status = JobStatus.RUNNING
+        logger.info('Job %s started for %s', job.id, request.url)
+        try:
+            generator = ArticleGenerator(request=request, session=http_client(), llm_session=provider_transport())
+            job.result = await generator.generate_article()
+            job.status = JobStatus.DONE
+        except Exception as e:
+            logger.exception('Job %s failed', job.id)
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        self._finished_at[job.id] = time.monotonic()
+        if request.webhook_url:
+            await self._notify(job, request.webhook_url)
+
+    async def _notify(self, job: Job, webhook_url: str) -> None:
+        """Отправляет готовую задачу на webhook, ошибки доставки только логируются"""
+        try:
+            async with http_client().post(
+                    webhook_url,
+                    data=job.json(),
+                    headers={'Content-Type': 'application/json'},
+            ) as response:
+                if response.status >= 400:
+                    logger.warning('Webhook %s for job %s returned %d', webhook_url, job.id, response.status)
+        except Exception:
+            logger.exception('Webhook %s for job %s failed', webhook_url, job.id)
+
+    def _prune(self) -> None:
+        """Забывает завершённые задачи старше ttl"""
+        deadline = time.monotonic() - self.ttl
+        for job_id, finished_at in list(self._finished_at.items()):
+            if finished_at < deadline:
+                del self._finished_at[job_id]
+                self._jobs.pop(job_id, None)
+
+
+article_jobs = JobQueue(
+    workers=settings.job_workers,
+    max_size=settings.job_queue_size,
+    ttl=settings.job_ttl,
+)
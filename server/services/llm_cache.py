@@ -0,0 +1,169 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from server.config import settings
+from server.logger import get_logger
+
+logger = get_logger()
+
+# Сколько секунд ждать, пока файл кэша заблокирован записью другого обработчика uvicorn
+_BUSY_TIMEOUT = 5
+# Удаление устаревших и вытеснение лишних записей - не чаще раза в столько секунд, а не при каждой записи
+_MAINTENANCE_INTERVAL = 60
+
+
+def cache_key(model: str, system: str, user: str) -> str:
+    """
+    Ключ ответа модели: модель, версия системного промпта и хэш пользовательского сообщения.
+    Версией промпта служит его хэш, поэтому изменение промпта само сбрасывает старые ответы.
+    """
+    prompt_version = hashlib.sha256(system.encode()).hexdigest()[:16]
+    content_hash = hashlib.sha256(user.encode()).hexdigest()
+    return f'{model}:{prompt_version}:{content_hash}'
+
+
+class LLMCache:
+    """
+    Хранит ответы языковой модели в sqlite на диске.
+    Записи живут ttl секунд, при превышении max_bytes вытесняются давно не читанные.
+    Кэш не обязателен для генерации: ошибки sqlite записываются в лог и считаются промахом или пропущенной записью.
+    """
+
+    def __init__(self, path: str, ttl: float, max_bytes: int) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._maintained = 0.0  # время последнего удаления устаревших записей
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await run_in_threadpool(self._get, key)
+        except sqlite3.Error as e:
+            logger.warning('LLM cache read failed, treat as miss: %s', e)
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        logger.debug('LLM cache %s, hits: %d, misses: %d', 'hit' if value else 'miss', self.hits, self.misses)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        try:
+            await run_in_threadpool(self._set, key, value)
+        except sqlite3.Error as e:
+            logger.warning('LLM cache write skipped: %s', e)
+
+    async def delete(self, key: str) -> None:
+        try:
+            await run_in_threadpool(self._delete, key)
+        except sqlite3.Error as e:
+            logger.warning('LLM cache delete skipped: %s', e)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            'enabled': settings.llm_cache_enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else None,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            if directory := os.path.dirname(self.path):
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT, check_same_thread=False)
+            try:
+                # WAL: чтение не ждёт записи других обработчиков, которые открыли тот же файл
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+                with connection:
+                    connection.execute(
+                        'CREATE TABLE IF NOT EXISTS responses ('
+                        'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                        'created REAL NOT NULL, accessed REAL NOT NULL)'
+                    )
+                    connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+                    connection.execute('CREATE INDEX IF NOT EXISTS responses_created ON responses (created)')
+            except sqlite3.Error:
+                connection.close()
+                raise
+            self._connection = connection
+        return self._connection
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            with connection:
+                if now - created > self.ttl:
+                    connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    return None
+                connection.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            return value
+
+    def _set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                    (key, value, len(value.encode()), now, now),
+                )
+            if now - self._maintained > _MAINTENANCE_INTERVAL:
+                with connection:
+                    connection.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl,))
+                    self._evict(connection)
+                self._maintained = now
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """
+        Удаляет давно не читанные записи, пока кэш не уложится в max_bytes.
+        Выполняется раз в _MAINTENANCE_INTERVAL, поэтому между проверками кэш может ненадолго превысить max_bytes.
+        """
+        total, = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = connection.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        connection.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+
+llm_cache = LLMCache(
+    path=settings.llm_cache_path,
+    ttl=settings.llm_cache_ttl,
+    max_bytes=settings.llm_cache_max_bytes,
+)
@@ -0,0 +1,94 @@
+import re
+import zlib
+from typing import Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from server.services.transcript.transcript import TranscriptEntry
+
+# Слова короче трёх букв почти всегда служебные и только шумят в сходстве
+_WORD_REGEX = re.compile(r'\w{3,}')
+# Размер векторов: слова раскладываются по признакам хэшем, без словаря.
+# crc32 вместо hash(): hash строк солится в каждом процессе, и границы тем менялись бы между воркерами
+_FEATURES = 2048
+
+
+def segment_topics(
+        sentences: Sequence[TranscriptEntry],
+        number_of_topics: int,
+        window: int,
+) -> list[tuple[float, float]]:
+    """
+    Делит предложения на темы без языковой модели (TextTiling).
+    Между соседними предложениями сравниваются TF-IDF векторы window предложений до и после,
+    границы тем ставятся в самых глубоких провалах сходства. Возвращает начало и конец каждой темы в секундах.
+    """
+    count = len(sentences)
+    if not count:
+        return []
+    number_of_topics = max(1, min(number_of_topics, count))
+
+    boundaries = sorted(_find_boundaries(_tf_idf(sentences), number_of_topics - 1, window)) if count > 1 else []
+    starts = [0, *boundaries]
+    ends = [*boundaries, count]
+    last = sentences[-1]
+    return [
+        (
+            sentences[start].start,
+            sentences[end].start if end < count else last.start + last.duration,
+        )
+        for start, end in zip(starts, ends)
+    ]
+
+
+def _tf_idf(sentences: Sequence[TranscriptEntry]) -> np.ndarray:
+    """Матрица предложения x признаки с весами TF-IDF"""
+    rows, columns = [], []
+    for row, sentence in enumerate(sentences):
+        for word in _WORD_REGEX.findall(sentence.text.lower()):
+            rows.append(row)
+            columns.append(zlib.crc32(word.encode()) % _FEATURES)
+    counts = np.zeros((len(sentences), _FEATURES), dtype=np.float32)
+    np.add.at(counts, (rows, columns), 1)
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    return counts * idf.astype(np.float32)
+
+
+def _find_boundaries(weights: np.ndarray, number_of_boundaries: int, window: int) -> list[int]:
+    """
+    Номера предложений, с которых начинаются новые темы.
+    Глубина провала - насколько сходство в промежутке ниже ближайших пиков слева и справа.
+    Границы ставятся только там, где оба блока полные и до краёв не меньше min_distance предложений:
+    у краёв блок из одного-двух предложений почти ни на что не похож и даёт ложный провал.
+    """
+    count = len(weights)
+    min_distance = max(1, count // (number_of_boundaries + 1) // 2)
+    margin = max(min_distance, window)
+    if number_of_boundaries <= 0 or count - margin < margin:
+        return []
+
+    # сумма векторов блока через накопленные суммы: каждый блок за O(1) вместо суммирования окна
+    cumulative = np.vstack([np.zeros((1, weights.shape[1]), dtype=weights.dtype), np.cumsum(weights, axis=0)])
+    gaps = np.arange(margin, count - margin + 1)
+    left = cumulative[gaps] - cumulative[gaps - window]
+    right = cumulative[gaps + window] - cumulative[gaps]
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    similarity = np.einsum('ij,ij->i', left, right) / np.maximum(norms, 1e-9)
+
+    padded = np.pad(similarity, window, constant_values=-np.inf)
+    peaks = sliding_window_view(padded, window + 1)
+    left_peak = peaks[:len(similarity)].max(axis=1)
+    right_peak = peaks[window:window + len(similarity)].max(axis=1)
+    depth = left_peak + right_peak - 2 * similarity
+
+    # самые глубокие провалы, но не ближе min_distance предложений друг к другу, чтобы темы не дробились
+    boundaries: list[int] = []
+    for gap in np.argsort(-depth, kind='stable'):
+        boundary = int(gaps[gap])
+        if all(abs(boundary - chosen) >= min_distance for chosen in boundaries):
+            boundaries.append(boundary)
+            if len(boundaries) == number_of_boundaries:
+                break
+    return boundaries
@@ -0,0 +1,26 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные одинаковые вызовы.
+    Пока вызов с ключом выполняется, остальные вызовы с тем же ключом ждут его результат
+    (или исключение) вместо того, чтобы выполнять ту же работу повторно.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        if (call := self._calls.get(key)) is None:
+            # задача не отменяется вместе с первым ожидающим, остальные всё равно получат результат
+            call = asyncio.ensure_future(func())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(call)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,71 @@
+import asyncio
+import re
+import shutil
+from typing import AsyncIterator, Optional
+
+_CHUNK_SIZE = 256 * 1024
+_SILENCE_REGEX = re.compile(r'silence_(start|end): (-?\d+(?:\.\d+)?)')
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which('ffmpeg') is not None
+
+
+async def read_segment(url: str, start: float, duration: float) -> AsyncIterator[bytes]:
+    """
+    Отдаёт кусок аудио [start, start + duration) в виде wav 16 кГц моно.
+    ffmpeg сам читает только нужную часть файла по url, результат не накапливается в памяти.
+    """
+    process = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-nostdin', '-loglevel', 'error',
+        '-ss', f'{start:.3f}', '-t', f'{duration:.3f}', '-i', url,
+        '-vn', '-ac', '1', '-ar', '16000', '-f', 'wav', '-',
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        while chunk := await process.stdout.read(_CHUNK_SIZE):
+            yield chunk
+        _, stderr = await process.communicate()
+        if process.returncode:
+            raise RuntimeError(f'ffmpeg failed to cut audio at {start:.1f}s: {stderr.decode(errors="ignore")}')
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def find_silence(
+        url: str,
+        around: float,
+        window: float,
+        noise_db: int = -30,
+        min_duration: float = 0.3,
+) -> Optional[float]:
+    """
+    Ищет тишину в окне [around - window, around + window] и возвращает середину тишины,
+    ближайшей к around, или None если тишины нет.
+    """
+    start = max(around - window, 0)
+    process = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-nostdin', '-hide_banner',
+        '-ss', f'{start:.3f}', '-t', f'{window * 2:.3f}', '-i', url,
+        '-vn', '-af', f'silencedetect=noise={noise_db}dB:d={min_duration}', '-f', 'null', '-',
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    if process.returncode:
+        return None
+
+    silences = []
+    silence_start = None
+    for kind, value in _SILENCE_REGEX.findall(stderr.decode(errors='ignore')):
+        if kind == 'start':
+            silence_start = float(value)
+        elif silence_start is not None:
+            silences.append(start + (silence_start + float(value)) / 2)
+            silence_start = None
+    if not silences:
+        return None
+    return min(silences, key=lambda silence: abs(silence - around))
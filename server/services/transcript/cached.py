@@ -0,0 +1,121 @@
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional, Union
+
+from pytube import extract
+from youtube_transcript_api import _errors as youtube_transcript_errors
+
+from server.config import settings
+from server.logger import get_logger
+from server.services.singleflight import SingleFlight
+from server.services.transcript.transcript import Transcript
+from server.services.transcript.transcript_provider_abc import TranscriptProvider
+
+logger = get_logger()
+
+_DISABLED = object()  # отметка о том, что у видео нет субтитров
+
+
+class TranscriptCache:
+    """
+    LRU кэш расшифровок в памяти процесса.
+    Расшифровки хранятся сжатыми, общий объём ограничен max_bytes.
+    Для видео без субтитров хранится отрицательная запись, которая живёт negative_ttl секунд.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, negative_ttl: float) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict[tuple[str, str], tuple[float, Union[bytes, object]]] = OrderedDict()
+        self._size = 0
+
+    def get(self, key: tuple[str, str]) -> Optional[Union[bytes, object]]:
+        if (entry := self._entries.get(key)) is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: tuple[str, str], value: bytes, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        self._put(key, value, self.ttl if ttl is None else ttl)
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def set_disabled(self, key: tuple[str, str]) -> None:
+        self._put(key, _DISABLED, self.negative_ttl)
+
+    def _put(self, key: tuple[str, str], value: Union[bytes, object], ttl: float) -> None:
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._size += _entry_size(value)
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        if (entry := self._entries.pop(key, None)) is not None:
+            self._size -= _entry_size(entry[1])
+
+
+def _entry_size(value: Union[bytes, object]) -> int:
+    return len(value) if isinstance(value, bytes) else 0
+
+
+def _compress(transcript: Transcript) -> bytes:
+    return zlib.compress(transcript.to_bytes())
+
+
+def _decompress(value: bytes) -> Transcript:
+    return Transcript.from_bytes(zlib.decompress(value))
+
+
+_transcript_flight = SingleFlight()
+
+transcript_cache = TranscriptCache(
+    max_bytes=settings.transcript_cache_max_bytes,
+    ttl=settings.transcript_cache_ttl,
+    negative_ttl=settings.transcript_cache_negative_ttl,
+)
+
+
+class CachedTranscriptProvider(TranscriptProvider):
+    """
+    Кэширует расшифровки другого TranscriptProvider по id видео и типу провайдера.
+    Одновременные запросы одного видео ждут одну общую загрузку.
+    """
+
+    def __init__(
+            self,
+            provider: TranscriptProvider,
+            cache: TranscriptCache = transcript_cache,
+    ) -> None:
+        super().__init__(provider.url, provider.session)
+        self.provider = provider
+        self.cache = cache
+
+    async def get_transcript(self) -> Transcript:
+        video_id = extract.video_id(self.url)
+        key = (type(self.provider).__name__, video_id)
+
+        cached = self.cache.get(key)
+        if cached is _DISABLED:
+            logger.debug('Transcripts for %s are disabled (cached)', video_id)
+            raise youtube_transcript_errors.TranscriptsDisabled(video_id)
+        if cached is not None:
+            logger.debug('Transcript for %s from cache', video_id)
+            return _decompress(cached)
+
+        return await _transcript_flight.do(key, lambda: self._fetch(key))
+
+    async def _fetch(self, key: tuple[str, str]) -> Transcript:
+        try:
+            transcript = await self.provider.get_transcript()
+        except youtube_transcript_errors.TranscriptsDisabled:
+            self.cache.set_disabled(key)
+            raise
+        self.cache.set(key, _compress(transcript))
+        return transcript
@@ -0,0 +1,57 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Union
+
+from server.services.chunker import estimate_tokens
+from server.services.transcript.transcript import Transcript, TranscriptSlice
+
+# Сколько последних слов сравнивается с началом следующей строки
+_WINDOW_WORDS = 32
+# Совпадение короче этого считается случайным ("и", "да"), кроме полного повтора строки
+_MIN_OVERLAP_WORDS = 2
+
+
+@dataclass
+class DeduplicationStats:
+    """Сколько символов и токенов убрано из расшифровки"""
+    characters: int = 0
+    tokens: int = 0
+
+
+def deduplicate(transcript: Union[Transcript, TranscriptSlice]) -> tuple[Transcript, DeduplicationStats]:
+    """
+    Убирает повторы между соседними строками автоматических субтитров.
+    Если строка начинается с конца предыдущих, повтор отрезается, строка целиком из повтора
+    сливается с предыдущей: время начала остаётся самым ранним, длительность растягивается.
+    Сравниваются только последние _WINDOW_WORDS слов, поэтому время линейно от длины расшифровки.
+    """
+    result = Transcript(source=transcript.source)
+    stats = DeduplicationStats()
+    tail: deque[str] = deque(maxlen=_WINDOW_WORDS)  # последние слова в нижнем регистре
+    for line in transcript:
+        words = line.text.split()
+        lowered = [word.lower() for word in words]
+        overlap = _overlap(tail, lowered)
+        if overlap == len(words) and result:
+            end = max(result.starts[-1] + result.durations[-1], line.start + line.duration)
+            result.durations[-1] = end - result.starts[-1]
+            text = ''
+        else:
+            text = ' '.join(words[overlap:]) if overlap else line.text
+            result.append(text, line.start, line.duration)
+        if overlap:
+            stats.characters += len(line.text) - len(text)
+            stats.tokens += estimate_tokens(line.text) - estimate_tokens(text)
+        tail.extend(lowered[overlap:])
+    return result, stats
+
+
+def _overlap(tail: deque[str], words: list[str]) -> int:
+    """Длина самого длинного конца tail, с которого начинается words"""
+    tail_words = list(tail)
+    for size in range(min(len(tail_words), len(words)), 0, -1):
+        if size < _MIN_OVERLAP_WORDS and size != len(words):
+            break
+        if tail_words[-size:] == words[:size]:
+            return size
+    return 0
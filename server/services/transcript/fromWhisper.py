@@ -1,39 +1,179 @@
-import io
+import asyncio
 import json
+from typing import AsyncIterator, Optional
 
-from pytube import YouTube
+from aiohttp import FormData
+from fastapi.concurrency import run_in_threadpool
+from pytube import Stream, YouTube
 
-from server.schemas import TranscriptPart
+from server.config import settings
+from server.logger import get_logger
+from server.schemas import TranscriptSource
+from server.services.transcript.audio import ffmpeg_available, find_silence, read_segment
+from server.services.transcript.transcript import Transcript
 from server.services.transcript.transcript_provider_abc import TranscriptProvider
+from server.services.transcript.whisper_pool import whisper_pool
+
+logger = get_logger()
+
+# YouTube ограничивает скорость загрузки без range, поэтому аудио скачивается частями как в pytube
+_RANGE_SIZE = 9 * 1024 * 1024
+_CHUNK_SIZE = 256 * 1024
+# Сколько кусков может лежать между загрузкой и отправкой, пока отправка отстаёт
+_PIPE_CHUNKS = 16
+
+
+class AudioSourceError(Exception):
+    """
+    Ошибка источника аудио (загрузка с YouTube, ffmpeg) во время отправки в Whisper.
+    Отдельный тип, чтобы пул не засчитывал её бэкенду Whisper.
+    """
 
 
 class WhisperTranscriptProvider(TranscriptProvider):
     """Получает расшифровку используя модель Whisper"""
 
-    async def get_transcript(self) -> list[TranscriptPart]:
-        buffer = self._get_audio_buffer()
-        whisper_response = await self._whisper_request(buffer.read())
-        return [TranscriptPart(
-            segment['text'],
-            segment['start'],
-            segment['end'] - segment['start'],
-        ) for segment in whisper_response['segments']]
-
-    def _get_audio_buffer(self) -> io.BytesIO:
-        buffer = io.BytesIO()
-        if stream := YouTube(self.url).streams.filter(
+    async def get_transcript(self) -> Transcript:
+        stream, duration = await run_in_threadpool(self._get_audio_stream)
+        if duration > settings.whisper_segment_length and ffmpeg_available():
+            return await self._get_segmented_transcript(stream.url, duration)
+
+        whisper_response = await self._whisper_request(
+            _pipe(self._download_audio(stream), _PIPE_CHUNKS),
+            stream.default_filename,
+            stream.mime_type,
+        )
+        transcript = Transcript(source=TranscriptSource.WHISPER)
+        _add_segments(transcript, whisper_response['segments'], 0, 0, float('inf'))
+        return transcript
+
+    async def _get_segmented_transcript(self, url: str, duration: float) -> Transcript:
+        """
+        Делит аудио на куски с перекрытием и расшифровывает их параллельно.
+        Каждому куску принадлежат фразы, начавшиеся между его границами,
+        поэтому фразы из перекрытия не дублируются.
+        """
+        cuts = await _plan_cuts(url, duration)
+        overlap = settings.whisper_segment_overlap
+        semaphore = asyncio.Semaphore(settings.whisper_segment_concurrency)
+        logger.info('Transcribe %s with whisper in %d segments', self.url, len(cuts) - 1)
+
+        async def transcribe(start: float, end: float) -> tuple[list[dict], float]:
+            audio_start = max(start - overlap, 0)
+            audio_end = min(end + overlap, duration)
+            async with semaphore:
+                whisper_response = await self._whisper_request(
+                    _pipe(read_segment(url, audio_start, audio_end - audio_start), _PIPE_CHUNKS),
+                    'segment.wav',
+                    'audio/wav',
+                )
+            return whisper_response['segments'], audio_start
+
+        responses = await asyncio.gather(*[transcribe(start, end) for start, end in zip(cuts, cuts[1:])])
+        transcript = Transcript(source=TranscriptSource.WHISPER)
+        for (segments, audio_start), start, end in zip(responses, cuts, cuts[1:]):
+            _add_segments(transcript, segments, audio_start, start, end if end < duration else float('inf'))
+        return transcript
+
+    def _get_audio_stream(self) -> tuple[Stream, float]:
+        """Находит аудио дорожку, её размер и длину видео (запросы к YouTube, блокирует поток)"""
+        video = YouTube(self.url)
+        if stream := video.streams.filter(
                 only_audio=True
         ).filter(file_extension="mp4").first():
-            stream.stream_to_buffer(buffer)
-            buffer.seek(0)
-            return buffer
+            # pytube запоминает размер, загрузка по частям его не запрашивает
+            if not stream.filesize:
+                raise ValueError(f'Audio stream size of {self.url} is unknown')
+            return stream, video.length
 
         raise ValueError(f'Video {self.url} has no audio stream')
 
-    async def _whisper_request(self, buffer: bytes):
-        async with self.session.post(
-                'http://localhost:9000/asr?encode=true&output=json',
-                data={'audio_file': buffer},
-        ) as response:
-            resp = await response.text()
-        return json.loads(resp)
+    async def _download_audio(self, stream: Stream) -> AsyncIterator[bytes]:
+        """Скачивает аудио дорожку частями, не держа её целиком в памяти"""
+        downloaded = 0
+        file_size = stream.filesize
+        while downloaded < file_size:
+            stop = min(downloaded + _RANGE_SIZE, file_size) - 1
+            async with self.session.get(f'{stream.url}&range={downloaded}-{stop}') as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+                    downloaded += len(chunk)
+                    yield chunk
+
+    async def _whisper_request(self, audio: AsyncIterator[bytes], filename: str, content_type: str):
+        form = FormData()
+        form.add_field('audio_file', audio, filename=filename, content_type=content_type)
+        async with whisper_pool.acquire() as backend:
+            async with self.session.post(backend.asr_url, data=form) as response:
+                response.raise_for_status()
+                resp = await response.text()
+            return json.loads(resp)
+
+
+async def _pipe(source: AsyncIterator[bytes], max_chunks: int) -> AsyncIterator[bytes]:
+    """
+    Передаёт куски из source через очередь ограниченного размера.
+    Загрузка идёт впереди отправки не больше чем на max_chunks кусков,
+    поэтому память не зависит от длины видео.
+    Ошибки source пробрасываются как AudioSourceError.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_chunks)
+    done = object()
+
+    async def produce():
+        try:
+            async for chunk in source:
+                await queue.put(chunk)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(done)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (chunk := await queue.get()) is not done:
+            if isinstance(chunk, Exception):
+                raise AudioSourceError(str(chunk) or type(chunk).__name__) from chunk
+            yield chunk
+    finally:
+        producer.cancel()
+
+
+def _add_segments(
+        transcript: Transcript,
+        segments: list[dict],
+        offset: float,
+        own_start: float,
+        own_end: float,
+) -> None:
+    """Сдвигает фразы куска на его начало и добавляет те, что начались в [own_start, own_end)"""
+    for segment in segments:
+        start = segment['start'] + offset
+        if own_start <= start < own_end:
+            transcript.append(segment['text'], start, segment['end'] - segment['start'])
+
+
+async def _plan_cuts(url: str, duration: float) -> list[float]:
+    """
+    Границы кусков аудио: через каждые whisper_segment_length секунд,
+    по возможности сдвинутые на ближайшую тишину.
+    """
+    length = settings.whisper_segment_length
+    cuts = []
+    cut = length
+    while cut < duration - length / 4:  # не оставляем в конце совсем короткий кусок
+        cuts.append(cut)
+        cut += length
+
+    if settings.whisper_split_at_silence and cuts:
+        window = settings.whisper_silence_window
+        # каждый поиск - отдельный ffmpeg, читающий YouTube, поэтому одновременно столько же, сколько кусков расшифровки
+        semaphore = asyncio.Semaphore(settings.whisper_segment_concurrency)
+
+        async def search(cut: float) -> Optional[float]:
+            async with semaphore:
+                return await find_silence(url, cut, window)
+
+        silences = await asyncio.gather(*[search(cut) for cut in cuts])
+        cuts = [silence if silence is not None else cut for cut, silence in zip(cuts, silences)]
+    return [0, *cuts, duration]
@@ -4,7 +4,8 @@ import youtube_transcript_api
 from fastapi.concurrency import run_in_threadpool
 
 from server.logger import get_logger
-from server.schemas import TranscriptPart
+from server.schemas import TranscriptSource
+from server.services.transcript.transcript import Transcript
 from server.services.transcript.transcript_provider_abc import TranscriptProvider
 
 logger = get_logger()
@@ -16,10 +17,13 @@ class YouTubeTranscriptProvider(TranscriptProvider):
     _YOUTUBE_REGEX = r'^.*(youtu\.be\/|v\/|u\/\w\/|embed\/|watch\?v=|\&v=)([^#\&\?]*).*'
     _transcript_api = youtube_transcript_api.YouTubeTranscriptApi()
 
-    async def get_transcript(self) -> list[TranscriptPart]:
+    async def get_transcript(self) -> Transcript:
         transcript = self._best_transcript(await self._get_transcripts())
         transcript_data = await run_in_threadpool(transcript.fetch)
-        return [TranscriptPart(**entry) for entry in transcript_data]
+        result = Transcript(source=TranscriptSource.GENERATED if transcript.is_generated else TranscriptSource.MANUAL)
+        for entry in transcript_data:
+            result.append(entry['text'], entry['start'], entry['duration'])
+        return result
 
     def _youtuble_url_to_video_id(self) -> str:
         if match := re.match(pattern=self._YOUTUBE_REGEX, string=self.url):
@@ -0,0 +1,48 @@
+import re
+from array import array
+from typing import Union
+
+from server.services.transcript.transcript import Transcript, TranscriptSlice
+
+# Один проход по строке: пометки в квадратных скобках ([музыка], [смех], [Music]), нотные знаки,
+# отдельно стоящие тире и >> (смена говорящего) пропускаются, слова забираются целиком
+_TOKEN_REGEX = re.compile(r'\[[^\]]*\]|[♪♫♬♩]+|>>+|(?<!\S)[-–—]+(?!\S)|([^\s\[\]♪♫♬♩]+)')
+
+
+def normalize_text(text: str) -> str:
+    """Убирает пометки, нотные знаки и лишние пробелы из строки"""
+    return ' '.join(match[1] for match in _TOKEN_REGEX.finditer(text) if match[1])
+
+
+class NormalizedTranscript:
+    """
+    Очищенный текст расшифровки по словам.
+    Для каждого слова хранится время его начала и конца в видео,
+    поэтому предложения из этих слов переводятся обратно во время по номерам слов.
+    """
+
+    def __init__(self) -> None:
+        self.words: list[str] = []
+        self.starts = array('d')  # время начала слова
+        self.ends = array('d')  # время конца слова
+
+    def append(self, word: str, start: float, end: float) -> None:
+        self.words.append(word)
+        self.starts.append(start)
+        self.ends.append(end)
+
+
+def normalize_transcript(transcript: Union[Transcript, TranscriptSlice]) -> NormalizedTranscript:
+    """
+    Очищает расшифровку за один проход по строкам, не склеивая их в общую строку.
+    Время слова считается по его положению в строке: длительность строки делится по символам.
+    """
+    normalized = NormalizedTranscript()
+    for line in transcript:
+        text = line.text
+        seconds_per_char = line.duration / len(text) if text else 0
+        for match in _TOKEN_REGEX.finditer(text):
+            if word := match[1]:
+                start, end = match.span(1)
+                normalized.append(word, line.start + start * seconds_per_char, line.start + end * seconds_per_char)
+    return normalized
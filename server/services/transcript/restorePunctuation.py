@@ -1,17 +1,404 @@
-from typing import List
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Sequence, TYPE_CHECKING
 
-from punctuators.models import PunctCapSegModelONNX
+from fastapi.concurrency import run_in_threadpool
 
-m: PunctCapSegModelONNX = PunctCapSegModelONNX.from_pretrained(
-    "1-800-BAD-CODE/xlm-roberta_punctuation_fullstop_truecase"
-)
+from server.config import settings
+from server.logger import get_logger
+
+if TYPE_CHECKING:
+    import onnxruntime as ort
+    from punctuators.models import PunctCapSegModelONNX
+    from punctuators.models.punc_cap_seg_model import PunctCapSegConfigONNX
+
+logger = get_logger()
+
+_WARMUP_TEXT = 'привет как дела hello how are you'
+
+
+@dataclass(frozen=True)
+class OnnxProfile:
+    """
+    Настройки ONNX Runtime для модели.
+    0 потоков - решает ONNX Runtime, quantize - использовать int8 копию модели (нужен пакет onnx).
+    """
+
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    graph_optimization: str = 'all'
+    quantize: bool = False
+    cache_dir: str = '.cache/punctuation'
+
+
+_GRAPH_OPTIMIZATION_LEVELS = {
+    'disabled': 'ORT_DISABLE_ALL',
+    'basic': 'ORT_ENABLE_BASIC',
+    'extended': 'ORT_ENABLE_EXTENDED',
+    'all': 'ORT_ENABLE_ALL',
+}
+
+
+class PunctuationModel:
+    """
+    Модель восстановления пунктуации в текущем процессе.
+    Загружается и прогревается при первом использовании, до этого ready остаётся False.
+    Без profile сессия ONNX Runtime создаётся с настройками по умолчанию.
+    """
+
+    def __init__(self, name: str, profile: Optional[OnnxProfile] = None) -> None:
+        self.name = name
+        self.profile = profile
+        self.load_time: Optional[float] = None
+        self._model: Optional['PunctCapSegModelONNX'] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> 'PunctCapSegModelONNX':
+        """Загружает и прогревает модель (блокирует поток), повторные вызовы возвращают готовую модель"""
+        with self._lock:
+            if self._model is None:
+                from punctuators.models import PunctCapSegModelONNX
 
+                start_time = time.monotonic()
+                if self.profile is None:
+                    model = PunctCapSegModelONNX.from_pretrained(self.name)
+                else:
+                    model = self._build_model(self.profile)
+                model.infer(texts=[_WARMUP_TEXT], apply_sbd=True)
+                self.load_time = time.monotonic() - start_time
+                self._model = model
+                logger.info('Punctuation model %s loaded in %.1fs', self.name, self.load_time)
+            return self._model
 
-def restore_punctuation(raw_text):
-    input_texts: List[str] = [raw_text]
+    def infer(self, texts: List[str]) -> list[list[str]]:
+        return self.load().infer(texts=texts, apply_sbd=True)
 
-    results: list[str] = m.infer(
-        texts=input_texts, apply_sbd=True
+    def _build_model(self, profile: OnnxProfile) -> 'PunctCapSegModelONNX':
+        """
+        Собирает модель из её файлов сразу с сессией ONNX Runtime по профилю.
+        PunctCapSegModelONNX.__init__ всегда создаёт свою сессию по умолчанию, и модель загружалась бы дважды,
+        поэтому его работа повторяется здесь. Поля приватные и сверены с punctuators 0.0.5
+        (^0.0.5 в pyproject допускает только 0.0.5): при обновлении пакета их нужно сверить заново.
+        """
+        from huggingface_hub import hf_hub_download
+        from omegaconf import OmegaConf
+        from punctuators.models import PunctCapSegModelONNX
+        from sentencepiece import SentencePieceProcessor
+
+        cfg = self._config()
+        spe_path, model_path, config_path = (
+            hf_hub_download(repo_id=cfg.hf_repo_id, filename=filename)
+            for filename in (cfg.spe_filename, cfg.model_filename, cfg.config_filename)
+        )
+        config = OmegaConf.load(config_path)
+
+        model = PunctCapSegModelONNX.__new__(PunctCapSegModelONNX)
+        model._spe_path = spe_path
+        model._tokenizer = SentencePieceProcessor(spe_path)
+        model._ort_session = self._create_session(model_path, profile)
+        model._config = config
+        model._max_len = config.max_length
+        model._pre_labels = config.pre_labels
+        model._post_labels = config.post_labels
+        model._languages = config.languages
+        model._null_token = config.get('null_token', '<NULL>')
+        return model
+
+    def _create_session(self, model_path: str, profile: OnnxProfile) -> 'ort.InferenceSession':
+        """Создаёт сессию ONNX Runtime с настройками профиля"""
+        import onnxruntime as ort
+
+        if profile.quantize:
+            model_path = _quantized_model(model_path, profile.cache_dir, self.name)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = profile.intra_op_threads
+        options.inter_op_num_threads = profile.inter_op_threads
+        options.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel, _GRAPH_OPTIMIZATION_LEVELS[profile.graph_optimization]
+        )
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        return ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+    def _config(self) -> 'PunctCapSegConfigONNX':
+        """Файлы модели в huggingface, так же как их выбирает PunctCapSegModelONNX.from_pretrained"""
+        from punctuators.models import PunctCapSegModelONNX
+        from punctuators.models.punc_cap_seg_model import PunctCapSegConfigONNX
+
+        if '/' in self.name:
+            return PunctCapSegConfigONNX(hf_repo_id=self.name)
+        return PunctCapSegModelONNX.pretrained_model_info()[self.name]
+
+
+def _quantized_model(model_path: str, cache_dir: str, name: str) -> str:
+    """Возвращает путь к int8 копии модели, создавая её при первом обращении"""
+    quantized_path = os.path.join(cache_dir, name.replace('/', '--') + '.int8.onnx')
+    if os.path.exists(quantized_path):
+        return quantized_path
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        logger.warning('Package onnx is not installed, punctuation model is not quantized')
+        return model_path
+
+    logger.info('Quantizing punctuation model %s to int8', name)
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary_path = f'{quantized_path}.{os.getpid()}.tmp'  # обработчики могут квантовать одновременно
+    quantize_dynamic(model_path, temporary_path, weight_type=QuantType.QInt8)
+    os.replace(temporary_path, quantized_path)
+    return quantized_path
+
+
+def onnx_profile_from_settings() -> OnnxProfile:
+    return OnnxProfile(
+        intra_op_threads=settings.punctuation_intra_op_threads,
+        inter_op_threads=settings.punctuation_inter_op_threads,
+        graph_optimization=settings.punctuation_graph_optimization,
+        quantize=settings.punctuation_quantize,
+        cache_dir=settings.punctuation_cache_dir,
     )
 
-    return results
+
+punctuation_model = PunctuationModel(settings.punctuation_model, onnx_profile_from_settings())
+
+
+def _load_model() -> Optional[float]:
+    """Загружает модель в процессе обработчика и возвращает время загрузки"""
+    punctuation_model.load()
+    return punctuation_model.load_time
+
+
+def _infer(texts: List[str]) -> list[list[str]]:
+    return punctuation_model.infer(texts)
+
+
+class PunctuationService:
+    """
+    Выполняет модель пунктуации вне цикла событий.
+    Тексты от всех одновременных генераций собираются в общие пакеты: пакет уходит модели,
+    когда набралось max_batch_size текстов или первый текст прождал max_wait секунд.
+    При workers > 0 модель работает в отдельных процессах, иначе в пуле потоков текущего процесса.
+    """
+
+    def __init__(
+            self,
+            model: PunctuationModel,
+            workers: int,
+            max_batch_size: int,
+            max_wait: float,
+            eager_load: bool,
+    ) -> None:
+        self.model = model
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.eager_load = eager_load
+        self.load_time: Optional[float] = None
+        self.error: Optional[str] = None
+        self.batches = 0
+        self.batched_texts = 0
+        self._loaded = False
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future]]
+        self._slots: asyncio.Semaphore
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def loaded(self) -> bool:
+        """Модель загружена и прогрета хотя бы в одном обработчике"""
+        return self._loaded
+
+    @property
+    def ready(self) -> bool:
+        """
+        Готов ли обработчик принимать запросы.
+        При ленивой загрузке модель загружается первым запросом, поэтому обработчик готов сразу.
+        """
+        return self._loaded or not self.eager_load
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max(self.workers, 1))
+        if self.workers:
+            self._pool = self._create_pool()
+        self._spawn(self._batcher())
+        if self.eager_load:
+            self._spawn(self._load())
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def infer(self, texts: List[str]) -> list[list[str]]:
+        """Ставит тексты в очередь и ждёт результат, тексты могут попасть в разные пакеты"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    def stats(self) -> dict:
+        return {
+            'name': self.model.name,
+            'ready': self.ready,
+            'loaded': self.loaded,
+            'workers': self.workers,
+            'load_time': self.load_time,
+            'error': self.error,
+            'batches': self.batches,
+            'mean_batch_size': self.batched_texts / self.batches if self.batches else None,
+        }
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # модель загружается первой задачей, а не в initializer: ошибка initializer ломает пул навсегда
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    async def _run(self, function, *args):
+        if self._pool is None:
+            return await run_in_threadpool(function, *args)
+        pool = self._pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, function, *args)
+        except BrokenProcessPool:
+            # процесс обработчика упал (например, не хватило памяти), следующие пакеты пойдут в новый пул
+            if self._pool is pool:
+                logger.warning('Punctuation worker pool is broken, recreating it')
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._create_pool()
+            raise
+
+    async def _load(self) -> None:
+        try:
+            # по задаче на обработчик: пока один загружает модель, следующая задача достаётся другому
+            load_time = max(await asyncio.gather(*[self._run(_load_model) for _ in range(max(self.workers, 1))]))
+        except Exception as e:
+            logger.exception('Failed to load punctuation model %s', self.model.name)
+            self.error = str(e)
+        else:
+            self.load_time = load_time
+            self.error = None
+            self._loaded = True
+
+    async def _batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # пока все обработчики заняты, очередь копится и следующий пакет получается больше
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if batch:
+                self._spawn(self._run_batch(batch))
+            else:
+                self._slots.release()
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        try:
+            results = await self._run(_infer, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self.batches += 1
+            self.batched_texts += len(batch)
+            self.error = None
+            self._loaded = True
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+
+punctuation_service = PunctuationService(
+    model=punctuation_model,
+    workers=settings.punctuation_workers,
+    max_batch_size=settings.punctuation_max_batch_size,
+    max_wait=settings.punctuation_max_wait,
+    eager_load=settings.punctuation_eager_load,
+)
+
+
+async def restore_punctuation(
+        words: Sequence[str],
+        window: int = settings.punctuation_window_words,
+        overlap: int = settings.punctuation_window_overlap,
+        batch_size: int = settings.punctuation_batch_size,
+) -> list[list[str]]:
+    """
+    Восстанавливает пунктуацию и делит текст на предложения из слов.
+    Слова соответствуют входным один к одному, меняются только регистр и знаки препинания.
+    Текст подаётся модели окнами по window слов с перекрытием overlap, по batch_size окон за раз,
+    поэтому память не зависит от длины текста. Окна разных запросов модель обрабатывает общими пакетами.
+    """
+    sentences = []
+    sentence: list[str] = []
+    async for word, sentence_end in _punctuate_words(words, window, overlap, batch_size):
+        sentence.append(word)
+        if sentence_end:
+            sentences.append(sentence)
+            sentence = []
+    if sentence:
+        sentences.append(sentence)
+    return sentences
+
+
+async def _punctuate_words(
+        words: Sequence[str],
+        window: int,
+        overlap: int,
+        batch_size: int,
+) -> AsyncIterator[tuple[str, bool]]:
+    """
+    Отдаёт каждое слово после модели и признак конца предложения на нём.
+    Слово берётся из того окна, где оно дальше от края: у края окна модели не хватает контекста.
+    """
+    if not words:
+        return
+    stride = window - overlap
+    starts = range(0, max(len(words) - overlap, 1), stride)
+    for batch_start in range(0, len(starts), batch_size):
+        batch = starts[batch_start:batch_start + batch_size]
+        results = await punctuation_service.infer([' '.join(words[start:start + window]) for start in batch])
+        for start, window_sentences in zip(batch, results):
+            window_words = words[start:start + window]
+            punctuated = [
+                (word, index == len(sentence_words) - 1)
+                for sentence_words in map(str.split, window_sentences)
+                for index, word in enumerate(sentence_words)
+            ]
+            if len(punctuated) != len(window_words):
+                logger.warning('Punctuation model changed the number of words, window at %d is left as is', start)
+                punctuated = [(word, False) for word in window_words]
+
+            own_start = start + overlap // 2 if start else 0
+            own_end = start + stride + overlap // 2 if start != starts[-1] else len(words)
+            for word in punctuated[own_start - start:own_end - start]:
+                yield word
@@ -0,0 +1,29 @@
+from typing import Union
+
+from server.services.transcript.normalize import normalize_transcript
+from server.services.transcript.restorePunctuation import restore_punctuation
+from server.services.transcript.transcript import Transcript, TranscriptSlice
+from server.services.transcript.utils import has_punctuation, split_sentences
+
+
+async def get_sentences(transcript: Union[Transcript, TranscriptSlice]) -> Transcript:
+    """
+    Делит расшифровку на предложения со временем начала и длительностью.
+    Ручные субтитры уже размечены автором и делятся по знакам препинания,
+    модель пунктуации нужна только для автоматических субтитров и Whisper.
+    Слова предложений совпадают со словами очищенной расшифровки, поэтому время берётся по номеру слова.
+    """
+    normalized = normalize_transcript(transcript)
+    words, starts, ends = normalized.words, normalized.starts, normalized.ends
+    if transcript.punctuated and has_punctuation(words):
+        sentences = split_sentences(words)
+    else:
+        sentences = await restore_punctuation([word.lower() for word in words])
+
+    result = Transcript(source=transcript.source)
+    first = 0
+    for sentence in sentences:
+        last = first + len(sentence) - 1
+        result.append(' '.join(sentence), starts[first], ends[last] - starts[first])
+        first = last + 1
+    return result
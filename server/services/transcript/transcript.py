@@ -0,0 +1,188 @@
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, Protocol, Sequence, Union, overload
+
+from server.schemas import TranscriptSource
+
+
+class TranscriptEntry(Protocol):
+    """Всё, у чего есть текст, начало и длительность: TranscriptPart, TranscriptLine"""
+    text: str
+    start: float
+    duration: float
+
+
+class TranscriptLine:
+    """Строка расшифровки, ссылается на колонки Transcript и ничего не копирует"""
+
+    __slots__ = ('_transcript', '_index')
+
+    def __init__(self, transcript: 'Transcript', index: int) -> None:
+        self._transcript = transcript
+        self._index = index
+
+    @property
+    def text(self) -> str:
+        return self._transcript.text_at(self._index)
+
+    @property
+    def start(self) -> float:
+        return self._transcript.starts[self._index]
+
+    @property
+    def duration(self) -> float:
+        return self._transcript.durations[self._index]
+
+    def __repr__(self) -> str:
+        return f'TranscriptLine(text={self.text!r}, start={self.start!r}, duration={self.duration!r})'
+
+
+class Transcript(Sequence[TranscriptLine]):
+    """
+    Расшифровка видео вместе с её происхождением, хранится по колонкам:
+    начала и длительности в array('d'), тексты одной строкой с массивом смещений.
+    Строки упорядочены по началу, выборка по времени ищет границы двоичным поиском.
+    """
+
+    def __init__(self, parts: Iterable[TranscriptEntry] = (), source: TranscriptSource = TranscriptSource.GENERATED):
+        self.source = source
+        self.starts = array('d')
+        self.durations = array('d')
+        self._offsets = array('q', [0])
+        self._text = ''
+        self._pending: list[str] = []  # тексты, ещё не дописанные в _text
+        self._sorted = True
+        for part in parts:
+            self.append(part.text, part.start, part.duration)
+
+    @property
+    def punctuated(self) -> bool:
+        """Пунктуацию и регистр расставил человек, модель восстановления не нужна"""
+        return self.source is TranscriptSource.MANUAL
+
+    def append(self, text: str, start: float, duration: float) -> None:
+        if self.starts and start < self.starts[-1]:
+            self._sorted = False
+        self.starts.append(start)
+        self.durations.append(duration)
+        self._offsets.append(self._offsets[-1] + len(text))
+        self._pending.append(text)
+
+    def text_at(self, index: int) -> str:
+        return self._buffer()[self._offsets[index]:self._offsets[index + 1]]
+
+    def slice(self, start: float, end: float) -> 'TranscriptSlice':
+        """Строки, начавшиеся в [start, end], без копирования"""
+        self._sort()
+        return TranscriptSlice(self, bisect_left(self.starts, start), bisect_right(self.starts, end))
+
+    def to_bytes(self) -> bytes:
+        """Заголовок в JSON и колонки как есть, без преобразования каждой строки"""
+        text = self._buffer().encode()
+        header = json.dumps({'source': self.source, 'count': len(self), 'text': len(text)}).encode()
+        return b''.join((
+            header, b'\n', self.starts.tobytes(), self.durations.tobytes(), self._offsets.tobytes(), text,
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Transcript':
+        header_end = data.index(b'\n')
+        header = json.loads(data[:header_end])
+        transcript = cls(source=TranscriptSource(header['source']))
+        position = header_end + 1
+        for column, count in (
+                (transcript.starts, header['count']),
+                (transcript.durations, header['count']),
+                (transcript._offsets, header['count'] + 1),
+        ):
+            size = count * column.itemsize
+            column.frombytes(data[position:position + size])
+            position += size
+        del transcript._offsets[0]  # колонка создана с нулевым смещением, оно есть и в данных
+        transcript._text = data[position:position + header['text']].decode()
+        transcript._sorted = all(a <= b for a, b in zip(transcript.starts, transcript.starts[1:]))
+        return transcript
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @overload
+    def __getitem__(self, index: int) -> TranscriptLine: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> 'TranscriptSlice': ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[TranscriptLine, 'TranscriptSlice']:
+        return TranscriptSlice(self, 0, len(self))[index]
+
+    def __iter__(self) -> Iterator[TranscriptLine]:
+        for index in range(len(self)):
+            yield TranscriptLine(self, index)
+
+    def __repr__(self) -> str:
+        return f'Transcript({list(self)!r}, source={self.source!r})'
+
+    def _buffer(self) -> str:
+        if self._pending:
+            self._text += ''.join(self._pending)
+            self._pending = []
+        return self._text
+
+    def _sort(self) -> None:
+        """Упорядочивает строки по началу, если они добавлялись не по порядку"""
+        if self._sorted:
+            return
+        order = sorted(range(len(self)), key=self.starts.__getitem__)
+        texts = [self.text_at(index) for index in order]
+        starts, durations = self.starts, self.durations
+        self.starts, self.durations = array('d'), array('d')
+        self._offsets, self._text, self._pending = array('q', [0]), '', []
+        for index, text in zip(order, texts):
+            self.append(text, starts[index], durations[index])
+        self._sorted = True
+
+
+class TranscriptSlice(Sequence[TranscriptLine]):
+    """Непрерывная часть расшифровки, ссылается на исходную расшифровку"""
+
+    def __init__(self, transcript: Transcript, start: int, stop: int) -> None:
+        self.transcript = transcript
+        self.start = start
+        self.stop = max(stop, start)
+
+    @property
+    def source(self) -> TranscriptSource:
+        return self.transcript.source
+
+    @property
+    def punctuated(self) -> bool:
+        return self.transcript.punctuated
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    @overload
+    def __getitem__(self, index: int) -> TranscriptLine: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> 'TranscriptSlice': ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[TranscriptLine, 'TranscriptSlice']:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('TranscriptSlice supports only contiguous slices')
+            return TranscriptSlice(self.transcript, self.start + start, self.start + stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Transcript index out of range')
+        return TranscriptLine(self.transcript, self.start + index)
+
+    def __iter__(self) -> Iterator[TranscriptLine]:
+        for index in range(self.start, self.stop):
+            yield TranscriptLine(self.transcript, index)
+
+    def __repr__(self) -> str:
+        return f'TranscriptSlice({list(self)!r})'
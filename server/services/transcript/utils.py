@@ -1,21 +1,27 @@
-def preporcess_transcript(raw_text):
-    """
-    Подготавливает текст.
-    Очищает от постфиксов ([музыка], [смех]), знака '\n'
-    """
-    clear_text = del_postscript(raw_text.replace('\n', ' ').replace('♪', '').strip(
-        ' - ').strip(' '))
+import re
+from typing import Sequence
 
-    return clear_text
+# слово, на котором заканчивается предложение: знак препинания и, возможно, закрывающая кавычка или скобка
+_SENTENCE_END_REGEX = re.compile(r'[.!?…]["»)]?$')
+# если знаков конца предложения меньше чем один на столько слов, пунктуации в тексте нет
+_MAX_WORDS_PER_SENTENCE = 60
 
 
-def del_postscript(text):
-    """
-    Удаляет постфиксы: [музыка], [смех]
-    """
-    startPostcript = text.find('[')
-    endPostcript = text.find(']')
-    if startPostcript != -1 and endPostcript != -1:
-        postcript = text[startPostcript:][:endPostcript + 1]
-        text = text.replace(postcript, '')
-    return text
+def has_punctuation(words: Sequence[str]) -> bool:
+    """Проверяет, что в тексте достаточно знаков конца предложения, чтобы делить его по ним"""
+    sentence_ends = sum(1 for word in words if _SENTENCE_END_REGEX.search(word))
+    return sentence_ends * _MAX_WORDS_PER_SENTENCE >= len(words)
+
+
+def split_sentences(words: Sequence[str]) -> list[list[str]]:
+    """Делит уже размеченный пунктуацией текст на предложения из слов"""
+    sentences = []
+    sentence: list[str] = []
+    for word in words:
+        sentence.append(word)
+        if _SENTENCE_END_REGEX.search(word):
+            sentences.append(sentence)
+            sentence = []
+    if sentence:
+        sentences.append(sentence)
+    return sentences
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+
+from server.config import settings
+from server.logger import get_logger
+
+logger = get_logger()
+
+
+class WhisperBackend:
+    """Один контейнер с Whisper и его статистика"""
+
+    def __init__(self, url: str) -> None:
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.failures = 0  # ошибок подряд
+        self.healthy = True
+        self.latency: Optional[float] = None  # скользящее среднее времени ответа, секунды
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def asr_url(self) -> str:
+        return f'{self.url}/asr?encode=true&output=json'
+
+    def stats(self) -> dict:
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'outstanding': self.outstanding,
+            'latency': self.latency,
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class WhisperPool:
+    """
+    Балансирует запросы между несколькими контейнерами Whisper.
+    Запрос уходит на исправный бэкенд с наименьшим числом выполняющихся запросов.
+    После max_failures ошибок подряд бэкенд исключается, пока его не вернёт проверка здоровья.
+    """
+
+    def __init__(
+            self,
+            urls: list[str],
+            health_path: str,
+            health_interval: float,
+            health_timeout: float,
+            max_failures: int,
+            latency_smoothing: float = 0.2,
+    ) -> None:
+        self.backends = [WhisperBackend(url) for url in urls]
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.max_failures = max_failures
+        self.latency_smoothing = latency_smoothing
+        self._session: ClientSession
+        self._health_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._session = ClientSession(timeout=ClientTimeout(total=self.health_timeout))
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        await self._session.close()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[WhisperBackend]:
+        """
+        Выбирает бэкенд на время запроса и учитывает результат.
+        Ошибка соединения, статуса или разбора ответа засчитывается бэкенду и пробрасывается дальше,
+        остальные ошибки (например, источника аудио) пробрасываются без учёта.
+        """
+        backend = self._choose()
+        backend.outstanding += 1
+        backend.requests += 1
+        start_time = time.monotonic()
+        try:
+            yield backend
+        except (ClientError, asyncio.TimeoutError, ValueError):
+            self._record_failure(backend)
+            raise
+        else:
+            self._record_success(backend, time.monotonic() - start_time)
+        finally:
+            backend.outstanding -= 1
+
+    def stats(self) -> list[dict]:
+        return [backend.stats() for backend in self.backends]
+
+    def _choose(self) -> WhisperBackend:
+        # если исключены все бэкенды, пробуем все: ошибка лучше гарантированного отказа
+        candidates = [backend for backend in self.backends if backend.healthy] or self.backends
+        return min(candidates, key=lambda backend: (backend.outstanding, backend.latency or 0))
+
+    def _record_success(self, backend: WhisperBackend, latency: float) -> None:
+        backend.failures = 0
+        if backend.latency is None:
+            backend.latency = latency
+        else:
+            backend.latency += self.latency_smoothing * (latency - backend.latency)
+
+    def _record_failure(self, backend: WhisperBackend) -> None:
+        backend.errors += 1
+        backend.failures += 1
+        if backend.healthy and backend.failures >= self.max_failures:
+            backend.healthy = False
+            logger.warning('Whisper backend %s ejected after %d failures', backend.url, backend.failures)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.gather(*[self._probe(backend) for backend in self.backends])
+            await asyncio.sleep(self.health_interval)
+
+    async def _probe(self, backend: WhisperBackend) -> None:
+        try:
+            async with self._session.get(backend.url + self.health_path) as response:
+                healthy = response.status < 500
+        except (ClientError, asyncio.TimeoutError):
+            healthy = False
+
+        if healthy and not backend.healthy:
+            logger.info('Whisper backend %s is back', backend.url)
+            backend.failures = 0
+        elif not healthy and backend.healthy:
+            logger.warning('Whisper backend %s failed health check', backend.url)
+        backend.healthy = healthy
+
+
+whisper_pool = WhisperPool(
+    urls=settings.whisper_urls,
+    health_path=settings.whisper_health_path,
+    health_interval=settings.whisper_health_interval,
+    health_timeout=settings.whisper_health_timeout,
+    max_failures=settings.whisper_max_failures,
+)
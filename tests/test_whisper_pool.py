@@ -0,0 +1,112 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from server.services.transcript import fromWhisper
+from server.services.transcript.fromWhisper import AudioSourceError, WhisperTranscriptProvider, _pipe
+from server.services.transcript.whisper_pool import WhisperPool
+
+_ATTEMPTS = 5
+
+
+async def _asr(request: web.Request) -> web.Response:
+    """Заменяет Whisper: читает загрузку целиком и отвечает одним сегментом"""
+    await request.read()
+    return web.json_response({'segments': [{'text': 'привет', 'start': 0, 'end': 1}]})
+
+
+async def _broken_asr(request: web.Request) -> web.Response:
+    await request.read()
+    return web.Response(status=500)
+
+
+async def _docs(request: web.Request) -> web.Response:
+    return web.Response(text='ok')
+
+
+async def _forbidden_audio(request: web.Request) -> web.Response:
+    """Заменяет googlevideo, который отказал в загрузке"""
+    return web.Response(status=403)
+
+
+async def _audio(request: web.Request) -> web.Response:
+    return web.Response(body=b'\0' * 100)
+
+
+async def _transcribe(asr_handler, audio_handler) -> tuple[list, dict]:
+    """Отправляет аудио со стороннего сервера в Whisper _ATTEMPTS раз, возвращает ошибки и статистику бэкенда"""
+    app = web.Application()
+    app.router.add_post('/asr', asr_handler)
+    app.router.add_get('/docs', _docs)
+    app.router.add_get('/audio', audio_handler)
+    server = TestServer(app)
+    await server.start_server()
+    pool = WhisperPool(
+        urls=[str(server.make_url(''))],
+        health_path='/docs',
+        health_interval=3600,
+        health_timeout=5,
+        max_failures=3,
+    )
+    pool.start()
+    original_pool, fromWhisper.whisper_pool = fromWhisper.whisper_pool, pool
+    errors = []
+    try:
+        async with ClientSession() as session:
+            provider = WhisperTranscriptProvider('https://youtu.be/abcdefghijk', session)
+            stream = SimpleNamespace(url=f"{server.make_url('/audio')}?id=1", filesize=100)
+            for _ in range(_ATTEMPTS):
+                try:
+                    response = await provider._whisper_request(
+                        _pipe(provider._download_audio(stream), 4), 'audio.mp4', 'audio/mp4'
+                    )
+                    assert response['segments'][0]['text'] == 'привет'
+                except Exception as e:
+                    errors.append(e)
+    finally:
+        fromWhisper.whisper_pool = original_pool
+        await pool.stop()
+        await server.close()
+    return errors, pool.backends[0].stats()
+
+
+def test_audio_source_errors_do_not_eject_backend():
+    errors, stats = asyncio.run(_transcribe(_asr, _forbidden_audio))
+    assert len(errors) == _ATTEMPTS
+    assert all(isinstance(error, AudioSourceError) for error in errors)
+    assert stats['healthy'] is True
+    assert stats['errors'] == 0
+
+
+def test_asr_errors_eject_backend():
+    errors, stats = asyncio.run(_transcribe(_broken_asr, _audio))
+    assert len(errors) == _ATTEMPTS
+    assert not any(isinstance(error, AudioSourceError) for error in errors)
+    assert stats['healthy'] is False
+    assert stats['errors'] == _ATTEMPTS
+
+
+def test_successful_requests_are_counted():
+    errors, stats = asyncio.run(_transcribe(_asr, _audio))
+    assert errors == []
+    assert stats['healthy'] is True
+    assert stats['requests'] == _ATTEMPTS
+    assert stats['latency'] is not None
+
+
+@pytest.mark.parametrize('error', [json.JSONDecodeError('bad', '', 0), RuntimeError('ffmpeg failed')])
+def test_pipe_wraps_source_errors(error):
+    async def source():
+        yield b'chunk'
+        raise error
+
+    async def read():
+        return [chunk async for chunk in _pipe(source(), 2)]
+
+    with pytest.raises(AudioSourceError) as raised:
+        asyncio.run(read())
+    assert raised.value.__cause__ is error